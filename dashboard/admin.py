@@ -1,12 +1,21 @@
 from django.contrib import admin
 
 # Register your models here.
-from dashboard.models import Country, Region, Station, UserProfile, DashboardMetric, AuditLog
+from dashboard.models import (
+    Country, Region, Station, UserProfile, DashboardMetric, AuditLog, StationMetricRollup, RollupWatermark,
+    MetricRetention, StationAlert, StationLatestMetric,
+)
 
 # Register your models here.
 admin.site.register(Country)
 admin.site.register(Region)
 admin.site.register(Station)
-admin.site.register(UserProfile)
-admin.site.register(DashboardMetric)
-admin.site.register(AuditLog)
+# __str__ of these models reads a related object; join it instead of one query per row.
+admin.site.register(UserProfile, list_select_related=['user'])
+admin.site.register(DashboardMetric, list_select_related=['station'])
+admin.site.register(AuditLog, list_select_related=['user'])
+admin.site.register(StationMetricRollup)
+admin.site.register(RollupWatermark)
+admin.site.register(MetricRetention)
+admin.site.register(StationAlert)
+admin.site.register(StationLatestMetric)
@@ -0,0 +1,307 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import connections
+from django.db.models import Aggregate, Avg, Count, DateTimeField, FloatField, Func, Max, Min
+from django.db.models.functions import Trunc
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+# The numeric columns of DashboardMetric that every aggregate endpoint reports on.
+METRIC_FIELDS = ('output', 'temperature', 'voltage', 'efficiency')
+
+# Percentiles reported by the summary endpoint (PostgreSQL only).
+SUMMARY_PERCENTILES = (0.5, 0.95)
+
+# Maps the ?group_by= values to the (key, label) lookups used in .values().
+# These work for DashboardMetric and StationMetricRollup alike.
+GROUP_BY_FIELDS = {
+    'country': ('station__country_id', 'station__country__name'),
+    'region': ('station__region_id', 'station__region__name'),
+    'station': ('station_id', 'station__name'),
+}
+# DashboardMetric-only lookups through its denormalized region/country, skipping the station join.
+METRIC_GROUP_BY_FIELDS = {
+    **GROUP_BY_FIELDS,
+    'country': ('country_id', 'country__name'),
+    'region': ('region_id', 'region__name'),
+}
+
+# Bucket sizes accepted by ?bucket=, smallest first.
+BUCKETS = {
+    '1m': timedelta(minutes=1),
+    '5m': timedelta(minutes=5),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+}
+
+# Trunc() kinds used as the portable fallback when DATE_BIN is unavailable, largest first.
+TRUNC_KINDS = (
+    ('day', timedelta(days=1)),
+    ('hour', timedelta(hours=1)),
+    ('minute', timedelta(minutes=1)),
+)
+
+# Upper bound on the number of points returned per chart series.
+MAX_SERIES_POINTS = 1000
+# An explicit bucket may yield up to this many times the requested points per
+# series before downsampling; finer requests are coarsened (see choose_bucket).
+MAX_BUCKET_OVERSAMPLING = 10
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL's ordered-set PERCENTILE_CONT aggregate."""
+    function = 'PERCENTILE_CONT'
+    template = '%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=float(percentile), **extra)
+
+
+class DateBin(Func):
+    """PostgreSQL 14+ DATE_BIN(), which buckets timestamps into arbitrary fixed intervals."""
+    function = 'DATE_BIN'
+    template = "%(function)s('%(interval)s'::interval, %(expressions)s, TIMESTAMPTZ '2000-01-01 00:00:00+00')"
+    output_field = DateTimeField()
+
+    def __init__(self, expression, interval, **extra):
+        super().__init__(expression, interval=f'{int(interval.total_seconds())} seconds', **extra)
+
+
+# --- Query parameter helpers ---
+def parse_time_param(params, name):
+    """Parses an ISO-8601 query parameter into an aware datetime (UTC if naive)."""
+    value = params.get(name)
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValidationError({name: f'Invalid datetime: {value!r}.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed, dt_timezone.utc)
+    return parsed
+
+
+def filter_time_window(queryset, params, field='timestamp'):
+    """
+    Restricts a queryset to the optional ?start= / ?end= window.
+    The window is half-open: start <= timestamp < end.
+    Returns the filtered queryset together with the parsed bounds.
+    """
+    start = parse_time_param(params, 'start')
+    end = parse_time_param(params, 'end')
+    if start and end and start >= end:
+        raise ValidationError({'end': 'end must be later than start.'})
+    if start:
+        queryset = queryset.filter(**{f'{field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{field}__lt': end})
+    return queryset, start, end
+
+
+def parse_int_param(params, name, default, minimum=1, maximum=None):
+    """Parses a positive integer query parameter, clamped to maximum."""
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValidationError({name: f'Invalid integer: {value!r}.'})
+    if parsed < minimum:
+        raise ValidationError({name: f'Must be at least {minimum}.'})
+    return min(parsed, maximum) if maximum else parsed
+
+
+# --- Summary aggregation ---
+def summary_aggregates(vendor, percentiles=True):
+    """Builds the aggregate expressions for the metric summary."""
+    aggregates = {'count': Count('id')}
+    for field in METRIC_FIELDS:
+        aggregates[f'{field}_avg'] = Avg(field)
+        aggregates[f'{field}_min'] = Min(field)
+        aggregates[f'{field}_max'] = Max(field)
+        if percentiles and vendor == 'postgresql':
+            for percentile in SUMMARY_PERCENTILES:
+                aggregates[f'{field}_p{round(percentile * 100)}'] = PercentileCont(field, percentile)
+    return aggregates
+
+
+def shape_summary_row(row):
+    """Turns a flat aggregate row into {'count': n, 'output': {'avg': ...}, ...}."""
+    shaped = {'count': row['count']}
+    for field in METRIC_FIELDS:
+        stats = {
+            'avg': row[f'{field}_avg'],
+            'min': row[f'{field}_min'],
+            'max': row[f'{field}_max'],
+        }
+        for percentile in SUMMARY_PERCENTILES:
+            key = f'p{round(percentile * 100)}'
+            stats[key] = row.get(f'{field}_{key}')
+        shaped[field] = stats
+    return shaped
+
+
+def validate_group_by(group_by):
+    if group_by is not None and group_by not in GROUP_BY_FIELDS:
+        raise ValidationError({'group_by': f'Must be one of: {", ".join(GROUP_BY_FIELDS)}.'})
+
+
+def summarize_metrics(queryset, group_by=None, percentiles=True):
+    """
+    Aggregates a DashboardMetric queryset in the database.
+    Returns the overall statistics and, if group_by is given, one entry per group.
+    """
+    validate_group_by(group_by)
+    queryset = queryset.order_by()
+    aggregates = summary_aggregates(connections[queryset.db].vendor, percentiles=percentiles)
+    result = {'overall': shape_summary_row(queryset.aggregate(**aggregates))}
+
+    if group_by:
+        key_field, name_field = METRIC_GROUP_BY_FIELDS[group_by]
+        rows = queryset.values(key_field, name_field).annotate(**aggregates).order_by(key_field)
+        groups = []
+        for row in rows:
+            group = {'id': row[key_field], 'name': row[name_field]}
+            group.update(shape_summary_row(row))
+            groups.append(group)
+        result['groups'] = groups
+    return result
+
+
+# --- Time-bucketed series ---
+def choose_bucket(start, end, max_points=MAX_SERIES_POINTS):
+    """Picks the finest bucket that keeps the start..end span within max_points."""
+    span = end - start
+    for name, size in BUCKETS.items():
+        if span / size <= max_points:
+            return name
+    return list(BUCKETS)[-1]
+
+
+def floor_to_bucket(value, size):
+    """Start of the epoch-aligned bucket of `size` containing `value`."""
+    seconds = int(size.total_seconds())
+    return value - timedelta(seconds=int(value.timestamp()) % seconds, microseconds=value.microsecond)
+
+
+def ceil_to_bucket(value, size):
+    """Smallest bucket boundary of `size` at or after `value`."""
+    floored = floor_to_bucket(value, size)
+    return floored if floored == value else floored + size
+
+
+def bucket_expression(vendor, size):
+    """
+    Returns (expression, db_size) for grouping timestamps into buckets of `size`.
+    PostgreSQL bins directly with DATE_BIN; other backends truncate to the largest
+    unit that divides `size` and the remainder is merged in Python.
+    """
+    if vendor == 'postgresql':
+        return DateBin('timestamp', size), size
+    for kind, unit in TRUNC_KINDS:
+        if size % unit == timedelta(0):
+            return Trunc('timestamp', kind, tzinfo=dt_timezone.utc), unit
+    raise ValueError(f'No portable truncation for bucket size {size}.')
+
+
+def _shape_bucket_row(row):
+    point = {'timestamp': row['bucket'], 'count': row['count']}
+    for field in METRIC_FIELDS:
+        point[field] = {
+            'avg': row[f'{field}_avg'],
+            'min': row[f'{field}_min'],
+            'max': row[f'{field}_max'],
+        }
+    return point
+
+
+def _merge_points(points, size):
+    """Merges consecutive finer-grained points into buckets of `size` (count-weighted averages)."""
+    merged = []
+    for point in points:
+        bucket_start = floor_to_bucket(point['timestamp'], size)
+        if merged and merged[-1]['timestamp'] == bucket_start:
+            target = merged[-1]
+            total = target['count'] + point['count']
+            for field in METRIC_FIELDS:
+                stats, other = target[field], point[field]
+                stats['avg'] = (stats['avg'] * target['count'] + other['avg'] * point['count']) / total
+                stats['min'] = min(stats['min'], other['min'])
+                stats['max'] = max(stats['max'], other['max'])
+            target['count'] = total
+        else:
+            point['timestamp'] = bucket_start
+            merged.append(point)
+    return merged
+
+
+def bucket_metrics(queryset, bucket):
+    """
+    Aggregates a DashboardMetric queryset into fixed-size time buckets per station.
+    Returns {station_id: [point, ...]} with points in ascending time order, each
+    carrying the bucket start, the sample count and avg/min/max of every metric.
+    """
+    size = BUCKETS[bucket]
+    vendor = connections[queryset.db].vendor
+    expression, db_size = bucket_expression(vendor, size)
+    rows = (
+        queryset.order_by()
+        .annotate(bucket=expression)
+        .values('station_id', 'bucket')
+        .annotate(**summary_aggregates(vendor, percentiles=False))
+        .order_by('station_id', 'bucket')
+    )
+    series = {}
+    for row in rows:
+        series.setdefault(row['station_id'], []).append(_shape_bucket_row(row))
+    if db_size != size:
+        series = {station_id: _merge_points(points, size) for station_id, points in series.items()}
+    return series
+
+
+def lttb_indices(xs, ys, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling.
+    Returns the indices of at most `threshold` points that best preserve the
+    visual shape of the (xs, ys) line.
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    indices = [0]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third vertex of the triangle.
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        span = next_end - next_start
+        avg_x = sum(xs[next_start:next_end]) / span
+        avg_y = sum(ys[next_start:next_end]) / span
+
+        # Pick the point in the current bucket forming the largest triangle.
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        indices.append(best)
+        a = best
+    indices.append(n - 1)
+    return indices
+
+
+def downsample_points(points, max_points, field='output'):
+    """Applies LTTB to a bucketed series, keyed on the average of `field`."""
+    if len(points) <= max_points:
+        return points
+    xs = [p['timestamp'].timestamp() for p in points]
+    ys = [p[field]['avg'] for p in points]
+    return [points[i] for i in lttb_indices(xs, ys, max_points)]
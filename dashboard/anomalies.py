@@ -0,0 +1,251 @@
+import math
+import warnings
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .aggregation import METRIC_FIELDS
+from .models import DashboardMetric, StationAlert
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Grid resolution: readings are averaged into columns of this many seconds.
+DEFAULT_STEP = 60
+DEFAULT_WINDOW = timedelta(hours=24)
+# Trailing columns (excluding the current one) behind each rolling z-score.
+DEFAULT_ZSCORE_WINDOW = 120
+# A z-score needs at least this many readings in its trailing window.
+MIN_PERIODS = 30
+# (warning, critical). Every station is scored at every step, so the levels sit
+# well above 3 to keep a day of ordinary noise from raising alerts.
+ZSCORE_LEVELS = (5.0, 8.0)
+# Fields that follow the sun are scored as a ratio to the fleet median at the
+# same time, which cancels the daily curve and each station's capacity. Steps
+# where the median is below RELATIVE_FLOOR of its peak (night) are skipped.
+RELATIVE_FIELDS = ('output',)
+RELATIVE_FLOOR = 0.05
+DRIFT_ALPHA = 0.1
+DRIFT_LEVELS = (2.0, 4.0)
+# {field: {'max' or 'min': (warning, critical)}}; overridable with settings.ANOMALY_THRESHOLDS.
+DEFAULT_THRESHOLDS = {
+    'temperature': {'max': (75.0, 85.0)},
+    'voltage': {'min': (215.0, 207.0), 'max': (245.0, 253.0)},
+    'efficiency': {'min': (60.0, 50.0)},
+}
+LOAD_CHUNK_SIZE = 20_000
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured('Anomaly detection requires numpy (pip install numpy).')
+
+
+# --- Loading ---
+class MetricGrid:
+    """
+    Every station's readings in [start, start + columns * step), averaged into a
+    (stations x columns) float array per metric field, NaN where a station has
+    no reading.
+    """
+
+    def __init__(self, station_ids, start, step, values, readings):
+        self.station_ids = station_ids
+        self.start = start
+        self.step = step
+        self.values = values
+        self.readings = readings
+
+    def column_time(self, column):
+        return self.start + timedelta(seconds=int(column) * self.step)
+
+
+def load_metric_grid(start, end, step=DEFAULT_STEP, queryset=None):
+    """
+    Reads the window in one unordered pass, chunk by chunk, and bins it into a
+    MetricGrid with bincount. Columns start on a multiple of `step` (epoch time).
+    """
+    require_numpy()
+    queryset = DashboardMetric.objects.all() if queryset is None else queryset
+    rows = (
+        queryset.filter(timestamp__gte=start, timestamp__lt=end).order_by()
+        .values_list('station_id', 'timestamp', *METRIC_FIELDS)
+        .iterator(chunk_size=LOAD_CHUNK_SIZE)
+    )
+    origin = math.floor(start.timestamp() / step) * step
+    start = datetime.fromtimestamp(origin, dt_timezone.utc)
+    columns_count = max(1, math.ceil((end.timestamp() - origin) / step))
+
+    station_index = {}
+    codes, epochs, readings = [], [], []
+    while chunk := list(islice(rows, LOAD_CHUNK_SIZE)):
+        station_ids, timestamps, *values = zip(*chunk)
+        codes.append(np.fromiter(
+            (station_index.setdefault(station_id, len(station_index)) for station_id in station_ids),
+            dtype=np.int64, count=len(chunk),
+        ))
+        epochs.append(np.fromiter((value.timestamp() for value in timestamps), dtype=np.float64, count=len(chunk)))
+        readings.append(np.array(values, dtype=np.float64))
+    if not codes:
+        return MetricGrid([], start, step, {field: np.empty((0, columns_count)) for field in METRIC_FIELDS}, 0)
+
+    codes, epochs, readings = np.concatenate(codes), np.concatenate(epochs), np.concatenate(readings, axis=1)
+    column = np.clip(((epochs - origin) // step).astype(np.int64), 0, columns_count - 1)
+    shape = (len(station_index), columns_count)
+    flat = codes * columns_count + column
+    counts = np.bincount(flat, minlength=shape[0] * shape[1]).reshape(shape)
+    values = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for field, field_values in zip(METRIC_FIELDS, readings):
+            sums = np.bincount(flat, weights=field_values, minlength=counts.size).reshape(shape)
+            values[field] = sums / counts
+    return MetricGrid(list(station_index), start, step, values, len(codes))
+
+
+# --- Vectorized statistics (all stations at once) ---
+def rolling_zscores(values, window=DEFAULT_ZSCORE_WINDOW, min_periods=MIN_PERIODS):
+    """
+    z-score of each cell against the mean/std of the `window` preceding columns
+    of the same row, ignoring NaNs. Cells with too little history are NaN.
+    """
+    rows, columns = values.shape
+    valid = ~np.isnan(values)
+    # Centering each row keeps the sum-of-squares variance numerically stable.
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        centered = values - np.nanmean(values, axis=1, keepdims=True)
+        # Windows flatter than this are rounding noise, not a spread to measure against.
+        min_std = 1e-3 * np.nanstd(values, axis=1, keepdims=True)
+    filled = np.where(valid, centered, 0.0)
+
+    def prefix(array):
+        return np.concatenate([np.zeros((rows, 1)), np.cumsum(array, axis=1)], axis=1)
+
+    sums, squares, counts = prefix(filled), prefix(filled * filled), prefix(valid.astype(np.float64))
+    ends = np.arange(columns)
+    starts = np.maximum(ends - window, 0)
+    n = counts[:, ends] - counts[:, starts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[:, ends] - sums[:, starts]) / n
+        variance = np.maximum((squares[:, ends] - squares[:, starts]) / n - mean * mean, 0.0)
+        std = np.sqrt(variance)
+        z = (centered - mean) / std
+    z[(n < min_periods) | (std <= min_std) | ~valid] = np.nan
+    return z
+
+
+def fleet_ratio(values, floor=RELATIVE_FLOOR):
+    """Each cell divided by the fleet median of its column; NaN where that median is near zero."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(values, axis=0)
+        median[~(median >= floor * np.nanmax(median))] = np.nan
+    return values / median
+
+
+def ewma_drift(values, alpha=DRIFT_ALPHA):
+    """
+    Per row: (EWMA at the last reading - window mean) / window std of the
+    readings' deviation from the fleet median. Returns (drift, last_column).
+    The EWMA recursion steps through columns, each step covering every station.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        residual = values - np.nanmedian(values, axis=0, keepdims=True)
+        baseline = np.nanmean(residual, axis=1)
+        spread = np.nanstd(residual, axis=1)
+
+    ewma = np.full(residual.shape[0], np.nan)
+    for column in residual.T:
+        present = ~np.isnan(column)
+        started = present & np.isnan(ewma)
+        ewma = np.where(started, column, ewma)
+        update = present & ~started
+        ewma[update] = alpha * column[update] + (1 - alpha) * ewma[update]
+
+    valid = ~np.isnan(residual)
+    last_column = residual.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drift = (ewma - baseline) / spread
+    drift[(spread <= 1e-9) | ~valid.any(axis=1)] = np.nan
+    return drift, last_column
+
+
+def worst_cells(scores):
+    """(column, score) of the highest non-NaN score per row; rows without any get -inf."""
+    filled = np.where(np.isnan(scores), -np.inf, scores)
+    columns = filled.argmax(axis=1)
+    return columns, filled[np.arange(filled.shape[0]), columns]
+
+
+# --- Detection ---
+def _severity(score, levels):
+    return 'critical' if score >= levels[1] else 'warning'
+
+
+def detect_anomalies(grid, zscore_window=DEFAULT_ZSCORE_WINDOW, thresholds=None):
+    """Unsaved StationAlerts: at most one per station, metric and kind for the scanned window."""
+    require_numpy()
+    if thresholds is None:
+        thresholds = getattr(settings, 'ANOMALY_THRESHOLDS', DEFAULT_THRESHOLDS)
+    alerts = []
+
+    def add(rows, columns, scores, field, kind, levels, describe):
+        values = grid.values[field]
+        for row, column, score in zip(rows, columns, scores):
+            value = float(values[row, column])
+            alerts.append(StationAlert(
+                station_id=grid.station_ids[row], timestamp=grid.column_time(column),
+                metric=field, kind=kind, severity=_severity(score, levels),
+                value=value, score=float(score), message=describe(row, value, score)[:255],
+            ))
+
+    for field in METRIC_FIELDS:
+        values = grid.values[field]
+        if not values.size:
+            continue
+        series = fleet_ratio(values) if field in RELATIVE_FIELDS else values
+
+        z = np.abs(rolling_zscores(series, zscore_window))
+        columns, scores = worst_cells(z)
+        rows = np.flatnonzero(scores >= ZSCORE_LEVELS[0])
+        flagged = (z >= ZSCORE_LEVELS[0]).sum(axis=1)
+        add(rows, columns[rows], scores[rows], field, 'zscore', ZSCORE_LEVELS,
+            lambda row, value, score, field=field, flagged=flagged:
+                f'{field} {value:.2f} is {score:.1f} standard deviations from its trailing mean '
+                f'({flagged[row]} readings flagged)')
+
+        drift, last = ewma_drift(series)
+        magnitude = np.abs(drift)
+        rows = np.flatnonzero(magnitude >= DRIFT_LEVELS[0])
+        add(rows, last[rows], magnitude[rows], field, 'drift', DRIFT_LEVELS,
+            lambda row, value, score, field=field, drift=drift:
+                f'{field} has drifted {score:.1f} standard deviations '
+                f'{"above" if drift[row] > 0 else "below"} its usual offset from the fleet median')
+
+        for bound, (warning, critical) in thresholds.get(field, {}).items():
+            # Scores are distances past the warning level, so larger is always worse.
+            excess = values - warning if bound == 'max' else warning - values
+            columns, scores = worst_cells(excess)
+            rows = np.flatnonzero(scores >= 0)
+            add(rows, columns[rows], scores[rows], field, 'threshold', (0.0, abs(critical - warning)),
+                lambda row, value, score, field=field, bound=bound, warning=warning:
+                    f'{field} {value:.2f} is {"above" if bound == "max" else "below"} the {warning:g} limit')
+    return alerts
+
+
+def scan_stations(end, window=DEFAULT_WINDOW, step=DEFAULT_STEP, zscore_window=DEFAULT_ZSCORE_WINDOW,
+                  queryset=None, save=True):
+    """
+    Loads the window ending at `end`, detects anomalies for every station and
+    (with save) stores new alerts. Returns (grid, alerts).
+    """
+    grid = load_metric_grid(end - window, end, step, queryset)
+    alerts = detect_anomalies(grid, zscore_window)
+    if save and alerts:
+        StationAlert.objects.bulk_create(alerts, ignore_conflicts=True, batch_size=1000)
+    return grid, alerts
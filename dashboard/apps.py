@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class DashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dashboard'
+
+    def ready(self):
+        # Connect the signal receivers that keep cached lookups in sync with the models.
+        from . import signals  # noqa: F401
+        # Count database connections for the /api/_db/ statistics.
+        from . import pooling  # noqa: F401
@@ -0,0 +1,207 @@
+import atexit
+import json
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, close_old_connections, connections, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 10_000
+DEFAULT_BATCH_SIZE = 500
+# Seconds the writer waits for more events before flushing a partial batch.
+DEFAULT_FLUSH_INTERVAL = 1.0
+# Seconds a producer waits for room in a full queue before writing the event itself.
+ENQUEUE_TIMEOUT = 1.0
+
+
+class AuditLogWriter:
+    """
+    Writes AuditLog rows from a background thread so requests only pay for a
+    queue append. Events are flushed with bulk_create in batches of up to
+    batch_size, at least every flush_interval seconds.
+
+    The queue is bounded: when it is full, producers wait up to
+    ENQUEUE_TIMEOUT for room and then write their event synchronously, so a
+    slow database slows writers down instead of losing events. stop() (run at
+    interpreter exit) drains the queue before returning.
+    """
+
+    def __init__(self, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, using='default'):
+        self.queue = queue.Queue(queue_size)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.using = using
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+                self._thread.start()
+
+    def enqueue(self, log):
+        if self._stopping.is_set():
+            self.write([log])
+            return
+        self.start()
+        try:
+            self.queue.put(log, timeout=ENQUEUE_TIMEOUT)
+        except queue.Full:
+            logger.warning('Audit log queue is full; writing the event synchronously.')
+            self.write([log])
+
+    def flush(self):
+        """Blocks until every event queued so far has been written."""
+        self.queue.join()
+
+    def stop(self, timeout=None):
+        """Flushes the queue and stops the writer thread."""
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            self.queue.put(None)
+            thread.join(timeout)
+        # Events that raced in behind the stop sentinel.
+        leftovers = []
+        while True:
+            try:
+                leftovers.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            self.queue.task_done()
+        leftovers = [log for log in leftovers if log is not None]
+        if leftovers:
+            self.write(leftovers)
+
+    def write(self, logs):
+        """Bulk-inserts logs; if the batch fails, retries row by row so one bad event cannot sink the rest."""
+        try:
+            AuditLog.objects.using(self.using).bulk_create(logs)
+            return
+        except DatabaseError:
+            if len(logs) == 1:
+                logger.exception('Dropping audit log event that could not be written: %s', logs[0].__dict__)
+                return
+            logger.warning('Audit log batch of %d failed; retrying one by one.', len(logs), exc_info=True)
+        for log in logs:
+            self.write([log])
+
+    def _next_batch(self):
+        """Waits for the first event, then collects whatever else is already queued (up to batch_size)."""
+        batch = []
+        try:
+            batch.append(self.queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        try:
+            while True:
+                batch = self._next_batch()
+                if not batch:
+                    continue
+                logs = [log for log in batch if log is not None]
+                try:
+                    if logs:
+                        close_old_connections()
+                        self.write(logs)
+                except Exception:
+                    logger.exception('Audit log writer failed to write %d events.', len(logs))
+                finally:
+                    for _ in batch:
+                        self.queue.task_done()
+                if len(logs) < len(batch):
+                    # stop() sentinel; everything queued before it has been written.
+                    return
+        finally:
+            connections[self.using].close()
+
+
+writer = AuditLogWriter(
+    queue_size=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', DEFAULT_QUEUE_SIZE),
+    batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE),
+    flush_interval=getattr(settings, 'AUDIT_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL),
+)
+atexit.register(writer.stop)
+
+
+# --- Events ---
+def record_event(user, action, target, details):
+    """
+    Records an audit event for `user`. The row is queued once the surrounding
+    transaction commits (immediately in autocommit), so rolled-back changes are
+    not logged. With settings.AUDIT_LOG_ASYNC off, it is written inline.
+    """
+    log = AuditLog(
+        user_id=user.pk,
+        timestamp=timezone.now(),
+        action=action,
+        target=target[:255],
+        details=json.dumps(details, cls=DjangoJSONEncoder),
+    )
+    if getattr(settings, 'AUDIT_LOG_ASYNC', True):
+        transaction.on_commit(lambda: writer.enqueue(log))
+    else:
+        transaction.on_commit(lambda: writer.write([log]))
+
+
+def diff_fields(before, after):
+    """{field: [old, new]} for every key whose value differs between two snapshots."""
+    return {
+        key: [before.get(key), after.get(key)]
+        for key in sorted(before.keys() | after.keys())
+        if before.get(key) != after.get(key)
+    }
+
+
+class AuditedViewSetMixin:
+    """
+    Records CREATE/UPDATE/DELETE audit events for a ModelViewSet's writes.
+    Snapshots are the serializer's representation of the object, so updates
+    are logged as a diff of the fields the API exposes.
+    """
+
+    def audit_snapshot(self, instance):
+        return dict(self.get_serializer(instance).data)
+
+    def audit_target(self, instance):
+        return f'{instance._meta.object_name}:{instance.pk}'
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        instance = serializer.instance
+        record_event(self.request.user, 'CREATE', self.audit_target(instance), {
+            'object': str(instance), 'after': self.audit_snapshot(instance),
+        })
+
+    def perform_update(self, serializer):
+        before = self.audit_snapshot(serializer.instance)
+        super().perform_update(serializer)
+        instance = serializer.instance
+        changes = diff_fields(before, self.audit_snapshot(instance))
+        if changes:
+            record_event(self.request.user, 'UPDATE', self.audit_target(instance), {
+                'object': str(instance), 'changes': changes,
+            })
+
+    def perform_destroy(self, instance):
+        target, label, before = self.audit_target(instance), str(instance), self.audit_snapshot(instance)
+        super().perform_destroy(instance)
+        record_event(self.request.user, 'DELETE', target, {'object': label, 'before': before})
@@ -0,0 +1,283 @@
+import io
+import json
+import platform
+import statistics
+import time
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.management import call_command
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from .exports import format_timestamp
+from .fleet import FLEET_ROLES
+from .models import AuditLog, DashboardMetric, Station, UserProfile
+from .perf import QueryRecorder
+from .pooling import connection_mode
+
+# List endpoints timed for every role; staff-only ones answer 403 for the others.
+ROLE_ENDPOINTS = (
+    ('bootstrap', 'dashboard/bootstrap/'),
+    ('users', 'users/'),
+    ('countries', 'countries/'),
+    ('regions', 'regions/'),
+    ('stations', 'stations/'),
+    ('stations_latest', 'stations/latest/'),
+    ('metrics', 'metrics/'),
+    ('metrics_summary', 'metrics/summary/?group_by=country'),
+    ('auditlog', 'auditlog/'),
+)
+API_PREFIX = '/api/'
+# Endpoint timed under each connection management mode.
+CONNECTION_ENDPOINT = 'stations/'
+# Overrides of the default database's settings per mode; 'pool' keeps the configured pool.
+CONNECTION_MODES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pool': {},
+}
+
+
+class BenchmarkRunner:
+    """
+    Times the key request paths against whatever is in the database and
+    collects one result per case:
+    {'name', 'group', 'ms': {min, median, p95, p99, max}, 'queries', 'bytes', 'status'}.
+    Every case is run once untimed (counting its queries) and then `repeat` times.
+    """
+
+    def __init__(self, repeat=5, stations=3, ingest_rows=10_000, latency_requests=200, stdout=None):
+        self.repeat = repeat
+        self.stations = stations
+        self.ingest_rows = ingest_rows
+        self.latency_requests = latency_requests
+        self.stdout = stdout
+        self.results = []
+
+    def log(self, message):
+        if self.stdout:
+            self.stdout.write(message)
+
+    # --- Timing primitives ---
+    def measure(self, name, group, run, repeat=None):
+        # connection.queries is reset at the start of each request, so count with a wrapper instead.
+        queries = QueryRecorder()
+        with connection.execute_wrapper(queries):
+            status, size = run()
+        timings = []
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        result = {
+            'name': name,
+            'group': group,
+            'ms': _summarize(timings),
+            'queries': queries.count,
+            'bytes': size,
+            'status': status,
+        }
+        self.results.append(result)
+        self.log(f'  {name:<50} {result["ms"]["median"]:>10.2f} ms  (p99 {result["ms"]["p99"]:>8.2f})  '
+                 f'{queries.count:>4} queries  {status}')
+        return result
+
+    def request(self, client, path, close_connections=False, **extra):
+        def run():
+            if close_connections:
+                # The test client skips the handler's connection cleanup; do it as a WSGI server would.
+                close_old_connections()
+            response = client.get(API_PREFIX + path, **extra)
+            if close_connections:
+                close_old_connections()
+            if response.streaming:
+                size = sum(len(chunk) for chunk in response.streaming_content)
+            else:
+                size = len(response.content)
+            return response.status_code, size
+        return run
+
+    def client_for(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    # --- Suites ---
+    def run_load_data(self, data_dir, use_copy):
+        """Times one full load_data --stream from data_dir. Replaces the database contents."""
+        started = time.perf_counter()
+        call_command('load_data', stream=True, copy=use_copy, data_dir=data_dir, stdout=io.StringIO())
+        elapsed = time.perf_counter() - started
+        rows = DashboardMetric.objects.count()
+        result = {
+            'name': 'load_data --stream' + (' --copy' if use_copy else ''),
+            'group': 'load',
+            'ms': _summarize([elapsed * 1000]),
+            'queries': None,
+            'bytes': None,
+            'status': 'ok',
+            'rows': rows,
+            'rows_per_sec': rows / elapsed if elapsed else None,
+        }
+        self.results.append(result)
+        self.log(f'  {result["name"]:<50} {elapsed:>10.2f} s   {rows:,} metrics ({result["rows_per_sec"]:,.0f} rows/sec)')
+
+    def run_roles(self):
+        for role in FLEET_ROLES:
+            profile = UserProfile.objects.filter(role=role, user__is_active=True).select_related('user').first()
+            if profile is None:
+                self.log(f'  (no active {role} user; skipped)')
+                continue
+            client = self.client_for(profile.user)
+            for name, path in ROLE_ENDPOINTS:
+                self.measure(f'{role}: {name}', 'api', self.request(client, path))
+
+    def run_history(self):
+        admin = AuthUser.objects.filter(is_staff=True, is_active=True).first()
+        if admin is None:
+            self.log('  (no active staff user; skipped)')
+            return
+        client = self.client_for(admin)
+        for station_id in Station.objects.order_by('id').values_list('id', flat=True)[:self.stations]:
+            latest = DashboardMetric.objects.filter(station_id=station_id).aggregate(latest=Max('timestamp'))['latest']
+            if latest is None:
+                continue
+            week_ago = format_timestamp(latest - timedelta(days=7))
+            for name, path in (
+                ('series auto', f'metrics/?station={station_id}&bucket=auto'),
+                ('series 1h, last 7 days', f'metrics/?station={station_id}&bucket=1h&start={week_ago}'),
+                ('raw page', f'metrics/?station={station_id}&page_size=1000'),
+                ('export ndjson, last 7 days', f'metrics/export/?station={station_id}&start={week_ago}'),
+            ):
+                self.measure(f'{station_id}: {name}', 'history', self.request(client, path))
+
+    def run_ingest(self):
+        """Posts ingest_rows NDJSON readings to /api/metrics/ingest/, rolling every batch back."""
+        admin = AuthUser.objects.filter(is_staff=True, is_active=True).first()
+        station_ids = list(Station.objects.values_list('id', flat=True)[:100])
+        if admin is None or not station_ids:
+            self.log('  (no staff user or stations; skipped)')
+            return
+        client = self.client_for(admin)
+        start = (DashboardMetric.objects.aggregate(latest=Max('timestamp'))['latest'] or timezone.now())
+        body = '\n'.join(
+            json.dumps({
+                'station': station_ids[i % len(station_ids)],
+                'timestamp': format_timestamp(start + timedelta(seconds=i + 1)),
+                'output': 100.0, 'temperature': 35.0, 'voltage': 230.0, 'efficiency': 90.0,
+            })
+            for i in range(self.ingest_rows)
+        ).encode()
+
+        def run():
+            with transaction.atomic():
+                response = client.post(
+                    API_PREFIX + 'metrics/ingest/', body, content_type='application/x-ndjson',
+                )
+                transaction.set_rollback(True)
+            return response.status_code, len(body)
+
+        self.measure(f'ingest {self.ingest_rows} rows (ndjson)', 'ingest', run)
+
+    def run_connections(self):
+        """
+        Times latency_requests calls to CONNECTION_ENDPOINT with connections
+        closed per request, kept persistent, and pooled (when a pool is
+        configured), each connection cleaned up as the request handler would.
+        """
+        admin = AuthUser.objects.filter(is_staff=True, is_active=True).first()
+        if admin is None:
+            self.log('  (no active staff user; skipped)')
+            return
+        client = self.client_for(admin)
+        configured = connection_mode(connection.settings_dict)
+        original = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS', 'OPTIONS')}
+        try:
+            for mode, overrides in CONNECTION_MODES.items():
+                if mode == 'pool' and configured != 'pool':
+                    continue
+                # Settings are read when connecting, so start each mode from a closed connection.
+                connection.close()
+                connection.settings_dict.update(original, **overrides)
+                if mode != 'pool':
+                    connection.settings_dict['OPTIONS'] = {
+                        key: value for key, value in (original['OPTIONS'] or {}).items() if key != 'pool'
+                    }
+                label = mode + (' (configured)' if mode == configured else '')
+                self.measure(
+                    f'{CONNECTION_ENDPOINT} {label}', 'connections',
+                    self.request(client, CONNECTION_ENDPOINT, close_connections=True), repeat=self.latency_requests,
+                )
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+
+    def run(self, data_dir=None, use_copy=False):
+        # The test client's host must pass ALLOWED_HOSTS.
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            if data_dir:
+                self.log('Loading the fleet...')
+                self.run_load_data(data_dir, use_copy)
+            self.log('API list calls per role...')
+            self.run_roles()
+            self.log('Metric history per station...')
+            self.run_history()
+            self.log('Ingestion...')
+            self.run_ingest()
+            self.log(f'Connection management ({self.latency_requests} requests per mode)...')
+            self.run_connections()
+        return self.report()
+
+    def report(self):
+        return {
+            'meta': {
+                'timestamp': format_timestamp(timezone.now()),
+                'vendor': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'repeat': self.repeat,
+                'dataset': {
+                    'stations': Station.objects.count(),
+                    'metrics': DashboardMetric.objects.count(),
+                    'users': AuthUser.objects.count(),
+                    'audit_logs': AuditLog.objects.count(),
+                },
+            },
+            'results': self.results,
+        }
+
+
+def _summarize(timings):
+    if not timings:
+        return {'min': None, 'median': None, 'p95': None, 'p99': None, 'max': None}
+    ordered = sorted(timings)
+    return {
+        'min': ordered[0],
+        'median': statistics.median(ordered),
+        'p95': ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        'p99': ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))],
+        'max': ordered[-1],
+    }
+
+
+def compare_results(current, baseline, threshold=0.2):
+    """
+    Cases whose median got more than `threshold` (a fraction) slower than in
+    `baseline`, as [(name, baseline_ms, current_ms)]. Cases missing from either
+    run, or without timings, are ignored.
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get(result['name'])
+        if before is None or before['ms']['median'] is None or result['ms']['median'] is None:
+            continue
+        if result['ms']['median'] > before['ms']['median'] * (1 + threshold):
+            regressions.append((result['name'], before['ms']['median'], result['ms']['median']))
+    return regressions
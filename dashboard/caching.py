@@ -0,0 +1,96 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .renderers import FastJSONRenderer
+from .scope import get_user_scope
+
+HIERARCHY_CACHE_TTL = 3600
+HIERARCHY_CACHE_PREFIX = 'dashboard:hierarchy'
+# Bumped whenever a country, region or station changes; doubles as Last-Modified.
+HIERARCHY_GENERATION_KEY = f'{HIERARCHY_CACHE_PREFIX}:generation'
+
+
+def _new_generation():
+    # Nanoseconds since the epoch, so the generation is also the modification time.
+    generation = time.time_ns()
+    cache.set(HIERARCHY_GENERATION_KEY, generation, None)
+    return generation
+
+
+def hierarchy_generation():
+    generation = cache.get(HIERARCHY_GENERATION_KEY)
+    return generation if generation is not None else _new_generation()
+
+
+def invalidate_hierarchy_cache():
+    _new_generation()
+
+
+def _entry_key(resource, scope, generation):
+    return f'{HIERARCHY_CACHE_PREFIX}:{generation}:{resource}:{scope.cache_key}'
+
+
+def _build_response(entry):
+    response = HttpResponse(entry['content'], content_type='application/json')
+    response['ETag'] = entry['etag']
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    # Revalidate on every use; the body depends on the user's scope.
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Cookie', 'Authorization'))
+    return response
+
+
+def cached_hierarchy_response(request, resource, scope, build_data):
+    """
+    Returns the JSON response for a hierarchy list, served from the shared
+    cache when possible. Entries are keyed by the scope rather than the user,
+    so users who see the same stations share them. A matching If-None-Match
+    (or If-Modified-Since) is answered with 304 straight from the cache entry;
+    build_data() runs only on a miss and should read from the primary, as a
+    lagging replica would keep pre-change data cached until the TTL.
+    """
+    generation = hierarchy_generation()
+    key = _entry_key(resource, scope, generation)
+    entry = cache.get(key)
+    if entry is None:
+        content = FastJSONRenderer().render(build_data())
+        entry = {
+            'content': content,
+            'etag': f'"{hashlib.sha1(content).hexdigest()}"',
+            'last_modified': generation // 1_000_000_000,
+        }
+        cache.set(key, entry, HIERARCHY_CACHE_TTL)
+
+    response = _build_response(entry)
+    return get_conditional_response(
+        request, etag=entry['etag'], last_modified=entry['last_modified'], response=response,
+    )
+
+
+class CachedHierarchyListMixin:
+    """
+    Serves a viewset's plain list action through cached_hierarchy_response,
+    serializing cache misses from the primary with the viewset's
+    row_serializer. Requests with
+    query parameters, or for a non-JSON renderer (the browsable API), fall
+    through to the regular list.
+    """
+    cache_resource = None
+    row_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params or request.accepted_renderer.format != 'json':
+            return super().list(request, *args, **kwargs)
+
+        def build_data():
+            queryset = self.filter_queryset(self.get_queryset()).using(DEFAULT_DB_ALIAS)
+            return self.row_serializer.serialize(self.row_serializer.values(queryset))
+
+        scope = get_user_scope(request.user)
+        return cached_hierarchy_response(request, self.cache_resource, scope, build_data)
@@ -0,0 +1,76 @@
+import base64
+import sys
+from array import array
+
+from .aggregation import METRIC_FIELDS
+
+# ?encoding= values for columnar responses: plain JSON number arrays, or
+# base64-encoded little-endian Float32 buffers (Float32Array in the browser).
+COLUMNAR_ENCODINGS = ('json', 'float32')
+SERIES_STATS = ('avg', 'min', 'max')
+
+
+def epoch_seconds(value):
+    return int(value.timestamp())
+
+
+def pack_float32(values):
+    """Base64 of the values as little-endian float32; missing values become NaN."""
+    buffer = array('f', [float('nan') if value is None else value for value in values])
+    if sys.byteorder == 'big':
+        buffer.byteswap()
+    return base64.b64encode(buffer.tobytes()).decode('ascii')
+
+
+def encode_floats(values, encoding):
+    return pack_float32(values) if encoding == 'float32' else list(values)
+
+
+def columnar_rows(rows, encoding='json'):
+    """
+    Turns raw metric rows (objects with id, timestamp, station and the metric
+    fields) into parallel arrays. Station IDs are dictionary-encoded: `station`
+    holds indices into `stations`.
+    """
+    stations, station_index = [], {}
+    station_column = []
+    for row in rows:
+        index = station_index.get(row.station)
+        if index is None:
+            index = station_index[row.station] = len(stations)
+            stations.append(row.station)
+        station_column.append(index)
+
+    columns = {
+        'id': [row.id for row in rows],
+        'timestamp': [epoch_seconds(row.timestamp) for row in rows],
+        'station': station_column,
+    }
+    for field in METRIC_FIELDS:
+        columns[field] = encode_floats([getattr(row, field) for row in rows], encoding)
+    return {'encoding': encoding, 'length': len(rows), 'stations': stations, 'columns': columns}
+
+
+def columnar_points(points, encoding='json'):
+    """Parallel arrays for one bucketed series: timestamp, count and {field: {avg, min, max}}."""
+    columns = {
+        'timestamp': [epoch_seconds(point['timestamp']) for point in points],
+        'count': [point['count'] for point in points],
+    }
+    for field in METRIC_FIELDS:
+        columns[field] = {
+            stat: encode_floats([point[field][stat] for point in points], encoding) for stat in SERIES_STATS
+        }
+    return columns
+
+
+def columnar_series(data, encoding='json'):
+    """Columnar form of a build_metric_series() result."""
+    return {
+        **data,
+        'encoding': encoding,
+        'series': [
+            {'station': series['station'], 'length': len(series['points']), **columnar_points(series['points'], encoding)}
+            for series in data['series']
+        ],
+    }
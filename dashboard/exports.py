@@ -0,0 +1,58 @@
+import csv
+import json
+
+# Field names match DashboardMetricSerializer's output.
+EXPORT_FIELDS = ('id', 'station', 'timestamp', 'output', 'temperature', 'voltage', 'efficiency')
+EXPORT_COLUMNS = ('id', 'station_id', 'timestamp', 'output', 'temperature', 'voltage', 'efficiency')
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def format_timestamp(value):
+    # Same representation as DRF's DateTimeField for UTC datetimes.
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class _LineBuffer:
+    """Write target for csv.writer that just returns the formatted line."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields metric rows as tuples in EXPORT_FIELDS order. values_list().iterator()
+    uses a server-side cursor on PostgreSQL, so only chunk_size rows are in memory.
+    """
+    for row in queryset.values_list(*EXPORT_COLUMNS).iterator(chunk_size=chunk_size):
+        yield row[:2] + (format_timestamp(row[2]),) + row[3:]
+
+
+def stream_ndjson(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields NDJSON text in blocks of chunk_size lines."""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(EXPORT_FIELDS, row))))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def stream_csv(rows, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yields CSV text (header first) in blocks of chunk_size lines."""
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(EXPORT_FIELDS)
+    lines = []
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
@@ -0,0 +1,167 @@
+import json
+import math
+import os
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .exports import format_timestamp
+
+# Roles in the order users are generated; matches UserProfile.ROLE_CHOICES.
+FLEET_ROLES = ('Admin', 'Country Lead', 'Station Manager', 'Viewer')
+DAYS_PER_MONTH = 30
+
+
+class FleetSpec:
+    """Shape of a synthetic fleet; every generated ID is derived from these numbers."""
+
+    def __init__(self, countries=3, regions_per_country=2, stations_per_region=5, users_per_role=2,
+                 months=1.0, interval_minutes=1, audit_logs=1000, seed=0, end=None):
+        self.countries = countries
+        self.regions_per_country = regions_per_country
+        self.stations_per_region = stations_per_region
+        self.users_per_role = users_per_role
+        self.months = months
+        self.interval_minutes = interval_minutes
+        self.audit_logs = audit_logs
+        self.seed = seed
+        self.end = end or timezone.now().replace(second=0, microsecond=0)
+
+    @property
+    def start(self):
+        return self.end - timedelta(days=self.months * DAYS_PER_MONTH)
+
+    @property
+    def station_count(self):
+        return self.countries * self.regions_per_country * self.stations_per_region
+
+    @property
+    def samples_per_station(self):
+        return int((self.end - self.start) / timedelta(minutes=self.interval_minutes))
+
+    @property
+    def metric_count(self):
+        return self.station_count * self.samples_per_station
+
+
+# --- Hierarchy and users (load_data's JSON shapes) ---
+def generate_hierarchy(spec):
+    countries, regions, stations = [], [], []
+    for c in range(spec.countries):
+        country_id = f'C{c:02d}'
+        countries.append({'id': country_id, 'name': f'Country {c}'})
+        for r in range(spec.regions_per_country):
+            region_id = f'{country_id}-R{r:02d}'
+            regions.append({'id': region_id, 'name': f'Region {c}.{r}', 'country_id': country_id})
+            for s in range(spec.stations_per_region):
+                stations.append({
+                    'id': f'{region_id}-S{s:03d}', 'name': f'Station {c}.{r}.{s}',
+                    'region_id': region_id, 'country_id': country_id,
+                })
+    return countries, regions, stations
+
+
+def generate_users(spec, countries, stations):
+    """users_per_role users of every role, assigned round-robin over countries and stations."""
+    users = []
+    for role in FLEET_ROLES:
+        slug = role.lower().replace(' ', '-')
+        for i in range(spec.users_per_role):
+            user = {
+                'id': len(users) + 1, 'email': f'{slug}-{i}@fleet.example', 'name': f'{role} {i}',
+                'role': role, 'active': True, 'country': None, 'region': None, 'station': None,
+            }
+            if role == 'Country Lead' or (role == 'Viewer' and i % 2):
+                user['country'] = countries[i % len(countries)]['id']
+            elif role in ('Station Manager', 'Viewer'):
+                station = stations[i % len(stations)]
+                user.update(country=station['country_id'], region=station['region_id'], station=station['id'])
+            users.append(user)
+    return users
+
+
+def generate_audit_logs(spec, users, rng):
+    actions = ('CREATE', 'UPDATE', 'DELETE', 'LOGIN')
+    span = (spec.end - spec.start).total_seconds()
+    offsets = sorted(rng.uniform(0, span) for _ in range(spec.audit_logs))
+    return [
+        {
+            'user_id': rng.choice(users)['id'],
+            'timestamp': format_timestamp(spec.start + timedelta(seconds=offset)),
+            'action': rng.choice(actions),
+            'target': 'synthetic',
+            'details': 'Generated by generate_fleet',
+        }
+        for offset in offsets
+    ]
+
+
+# --- Metrics ---
+def iter_metric_records(spec, stations, rng):
+    """
+    Per-interval readings for every station, in time order, in
+    dashboard_metrics.json's shape. Output follows a daily solar curve scaled
+    by a per-station capacity; temperature tracks output; voltage and
+    efficiency jitter around nominal values.
+    """
+    capacities = {station['id']: rng.uniform(80, 250) for station in stations}
+    step = timedelta(minutes=spec.interval_minutes)
+    timestamp = spec.start
+    for _ in range(spec.samples_per_station):
+        hour = timestamp.hour + timestamp.minute / 60
+        daylight = max(0.0, math.sin(math.pi * (hour - 6) / 12))
+        iso = format_timestamp(timestamp)
+        for station in stations:
+            output = capacities[station['id']] * daylight * rng.uniform(0.85, 1.0)
+            yield {
+                'station_id': station['id'],
+                'timestamp': iso,
+                'metrics': {
+                    'output': round(output, 3),
+                    'temperature': round(18 + 25 * daylight + rng.uniform(-2, 2), 2),
+                    'voltage': round(rng.gauss(230, 1.5), 2),
+                    'efficiency': round(min(99.5, rng.gauss(88, 3)), 2),
+                },
+            }
+        timestamp += step
+
+
+def write_json_array(path, records):
+    """Writes an iterable as a JSON array, one record per line, without holding it in memory."""
+    count = 0
+    with open(path, 'w') as f:
+        f.write('[\n')
+        for record in records:
+            if count:
+                f.write(',\n')
+            f.write(json.dumps(record))
+            count += 1
+        f.write('\n]\n')
+    return count
+
+
+def write_fleet(spec, directory, progress=None):
+    """
+    Writes countries/regions/stations/users/audit_logs/dashboard_metrics JSON
+    files in the layout load_data reads. Returns {file name: record count}.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(spec.seed)
+    countries, regions, stations = generate_hierarchy(spec)
+    users = generate_users(spec, countries, stations)
+
+    counts = {}
+    for name, records in (
+        ('countries.json', countries), ('regions.json', regions), ('stations.json', stations),
+        ('users.json', users), ('audit_logs.json', generate_audit_logs(spec, users, rng)),
+    ):
+        counts[name] = write_json_array(os.path.join(directory, name), records)
+        if progress:
+            progress(name, counts[name])
+
+    name = 'dashboard_metrics.json'
+    counts[name] = write_json_array(os.path.join(directory, name), iter_metric_records(spec, stations, rng))
+    if progress:
+        progress(name, counts[name])
+    return counts
@@ -0,0 +1,94 @@
+import math
+from datetime import timezone as dt_timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .loaders import DEFAULT_BATCH_SIZE, load_metric_rows, supports_copy
+from .models import Station
+
+STATIONS_CACHE_KEY = 'dashboard:stations:v2'
+STATIONS_CACHE_TTL = 300
+
+# Only the first few rejected rows are described in the response.
+MAX_REPORTED_ERRORS = 20
+
+VALUE_FIELDS = ('output', 'temperature', 'voltage', 'efficiency')
+
+
+# --- Station cache ---
+def known_stations():
+    """
+    Returns the set of all station ids, cached so validating a record never
+    queries Station.
+    """
+    stations = cache.get(STATIONS_CACHE_KEY)
+    if stations is None:
+        stations = frozenset(Station.objects.values_list('id', flat=True))
+        cache.set(STATIONS_CACHE_KEY, stations, STATIONS_CACHE_TTL)
+    return stations
+
+
+def invalidate_known_stations(**kwargs):
+    cache.delete(STATIONS_CACHE_KEY)
+
+
+# --- Validation ---
+def metric_row_from_payload(record, stations):
+    """
+    Validates one ingest record ({"station", "timestamp", "output", ...}) and returns
+    a tuple ordered as loaders.METRIC_COLUMNS. Raises ValueError on invalid input.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('Record must be an object.')
+    station_id = record.get('station')
+    if not isinstance(station_id, str):
+        raise ValueError(f'Invalid station: {station_id!r}.')
+    if station_id not in stations:
+        raise ValueError(f'Unknown station: {station_id!r}.')
+
+    raw_timestamp = record.get('timestamp')
+    timestamp = parse_datetime(raw_timestamp) if isinstance(raw_timestamp, str) else None
+    if timestamp is None:
+        raise ValueError(f'Invalid timestamp: {raw_timestamp!r}.')
+    if timezone.is_naive(timestamp):
+        timestamp = timestamp.replace(tzinfo=dt_timezone.utc)
+
+    values = []
+    for field in VALUE_FIELDS:
+        value = record.get(field)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+            raise ValueError(f'Invalid {field}: {value!r}.')
+        values.append(float(value))
+    return (station_id, timestamp, *values)
+
+
+# --- Ingestion ---
+def ingest_metric_records(records, batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """
+    Validates and writes an iterable of ingest records in batches, using COPY on
+    PostgreSQL and a raw executemany INSERT elsewhere. Invalid rows are rejected individually;
+    the valid ones are committed together.
+    Returns {'accepted': n, 'rejected': n, 'errors': [{'index': i, 'error': msg}, ...]}.
+    """
+    stations = known_stations()
+    errors = []
+    rejected = 0
+
+    def valid_rows():
+        nonlocal rejected
+        for index, record in enumerate(records):
+            try:
+                yield metric_row_from_payload(record, stations)
+            except ValueError as exc:
+                rejected += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    errors.append({'index': index, 'error': str(exc)})
+
+    with transaction.atomic(using=using):
+        accepted = load_metric_rows(
+            valid_rows(), batch_size=batch_size, use_copy=supports_copy(using), using=using,
+        )
+    return {'accepted': accepted, 'rejected': rejected, 'errors': errors}
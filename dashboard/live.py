@@ -0,0 +1,166 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .exports import EXPORT_COLUMNS, EXPORT_FIELDS, format_timestamp
+from .models import DashboardMetric
+from .rollups import SettledIdTracker
+
+logger = logging.getLogger(__name__)
+
+# Seconds between polls for new metrics while anyone is subscribed.
+POLL_INTERVAL = getattr(settings, 'METRIC_STREAM_POLL_INTERVAL', 1.0)
+# Seconds of silence after which a comment line is sent to keep proxies from closing the stream.
+HEARTBEAT_INTERVAL = 15
+# Maximum rows read per poll; a backlog is drained over consecutive polls without sleeping.
+FETCH_LIMIT = 5000
+# Maximum missed rows replayed to a client reconnecting with Last-Event-ID.
+REPLAY_LIMIT = 5000
+# Pending messages per subscriber before the oldest are dropped.
+SUBSCRIBER_QUEUE_SIZE = 256
+
+
+def _fetch_metrics_between(after_id, up_to_id, limit, metric_filter=None):
+    queryset = DashboardMetric.objects.filter(id__gt=after_id, id__lte=up_to_id)
+    if metric_filter is not None:
+        queryset = queryset.filter(metric_filter)
+    return list(queryset.order_by('id').values_list(*EXPORT_COLUMNS)[:limit])
+
+
+def encode_event(row):
+    """Formats a metric row (EXPORT_COLUMNS order) as a Server-Sent Event."""
+    data = dict(zip(EXPORT_FIELDS, row))
+    data['timestamp'] = format_timestamp(data['timestamp'])
+    return f"id: {data['id']}\nevent: metric\ndata: {json.dumps(data)}\n\n"
+
+
+class Subscriber:
+    __slots__ = ('scope', 'station_id', 'queue', 'dropped')
+
+    def __init__(self, scope, station_id=None):
+        self.scope = scope
+        self.station_id = station_id
+        self.queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, station_id):
+        if self.station_id is not None:
+            return station_id == self.station_id
+        return self.scope.allows_station(station_id)
+
+    def offer(self, message):
+        # A slow client loses its oldest pending messages rather than blocking everyone.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+
+class MetricBroadcaster:
+    """
+    Process-wide fan-out of new DashboardMetric rows to SSE subscribers.
+
+    A single polling task follows an id watermark, so the database sees the
+    same few queries per poll interval regardless of how many clients are
+    connected. Each event is encoded once and routed by station to the
+    subscribers whose scope allows it. The task runs only while there are
+    subscribers. The watermark only advances to settled ids
+    (rollups.SettledIdTracker), so rows committed late by a long ingest
+    transaction are still broadcast, at most a poll after they commit.
+    """
+
+    def __init__(self):
+        self.subscribers = set()
+        self.last_id = None
+        self._task = None
+        self._started = None
+
+    def subscribe(self, scope, station_id=None):
+        subscriber = Subscriber(scope, station_id)
+        self.subscribers.add(subscriber)
+        if self._task is None:
+            self._started = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return subscriber
+
+    async def position(self):
+        """The id after which rows are published to current subscribers."""
+        await self._started.wait()
+        return self.last_id
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, rows):
+        messages_by_station = defaultdict(list)
+        for row in rows:
+            messages_by_station[row[1]].append(encode_event(row))
+        chunks = {station_id: ''.join(messages) for station_id, messages in messages_by_station.items()}
+        everything = ''.join(chunks.values())
+
+        for subscriber in self.subscribers:
+            if subscriber.station_id is None and subscriber.scope.is_global:
+                subscriber.offer(everything)
+                continue
+            message = ''.join(chunk for station_id, chunk in chunks.items() if subscriber.wants(station_id))
+            if message:
+                subscriber.offer(message)
+
+    async def _run(self):
+        tracker = SettledIdTracker()
+        try:
+            while self.subscribers:
+                try:
+                    settled = await sync_to_async(tracker.poll)()
+                    if self.last_id is None:
+                        # The stream starts at the newest settled row.
+                        if settled is not None:
+                            self.last_id = settled
+                            self._started.set()
+                        rows = []
+                    else:
+                        rows = await sync_to_async(_fetch_metrics_between)(self.last_id, settled, FETCH_LIMIT)
+                except Exception:
+                    logger.exception('Polling for new metrics failed; retrying.')
+                    rows = []
+                if rows:
+                    self.last_id = rows[-1][0]
+                    self.publish(rows)
+                if len(rows) < FETCH_LIMIT:
+                    await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            # No await between the loop condition and this reset, so a new
+            # subscriber either keeps this task alive or starts a fresh one.
+            self._task = None
+            self.last_id = None
+
+
+broadcaster = MetricBroadcaster()
+
+
+async def stream_metric_events(scope, station_id=None, resume_after=None, resume_filter=None):
+    """
+    Async iterator of SSE text for one client; unsubscribes when the client goes
+    away. With resume_after (the client's Last-Event-ID), the rows it missed
+    that match resume_filter are replayed first, up to REPLAY_LIMIT of them.
+    """
+    subscriber = broadcaster.subscribe(scope, station_id)
+    try:
+        yield 'retry: 3000\n\n'
+        if resume_after is not None:
+            # Rows after the broadcaster's position are already queued for this subscriber.
+            position = await broadcaster.position()
+            rows = await sync_to_async(_fetch_metrics_between)(resume_after, position, REPLAY_LIMIT, resume_filter)
+            if rows:
+                yield ''.join(encode_event(row) for row in rows)
+        while True:
+            try:
+                yield await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+    finally:
+        broadcaster.unsubscribe(subscriber)
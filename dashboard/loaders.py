@@ -0,0 +1,306 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from django.db import connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog, DashboardMetric, Station, StationLatestMetric
+
+# Columns written by the bulk metric loaders, in COPY order.
+METRIC_COLUMNS = ('station_id', 'timestamp', 'output', 'temperature', 'voltage', 'efficiency')
+# Denormalized station columns the loaders fill in from Station as they insert.
+SCOPE_COLUMNS = ('region_id', 'country_id')
+INSERT_COLUMNS = METRIC_COLUMNS + SCOPE_COLUMNS
+
+DEFAULT_BATCH_SIZE = 5000
+READ_CHUNK_SIZE = 1 << 16
+
+
+# --- Incremental JSON parsing ---
+def iter_json_array(fileobj, chunk_size=READ_CHUNK_SIZE):
+    """
+    Yields the items of a top-level JSON array one at a time.
+    Only the item being decoded (plus one read chunk) is held in memory,
+    so arbitrarily large files can be streamed.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, pos, eof
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+    def skip(chars):
+        # Advances past whitespace and the given separators, reading more as needed.
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] in chars):
+                pos += 1
+            if pos < len(buffer) or eof:
+                return
+            fill()
+
+    skip('')
+    if pos >= len(buffer) or buffer[pos] != '[':
+        raise ValueError('Expected a JSON array.')
+    pos += 1
+
+    while True:
+        skip(',')
+        if pos >= len(buffer):
+            raise ValueError('Unterminated JSON array.')
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if not eof and (end == len(buffer) or not (buffer[end].isspace() or buffer[end] in ',]')):
+            # A number split across chunks decodes as a shorter one; re-decode once more is read.
+            fill()
+            continue
+        pos = end
+        yield item
+
+
+def iter_ndjson(fileobj):
+    """Yields one decoded object per non-blank line of a newline-delimited JSON file."""
+    for line in fileobj:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def batched(iterable, size):
+    """Splits an iterable into lists of at most `size` items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+# --- Metric rows ---
+def metric_row(record):
+    """Converts a dashboard_metrics.json record into a tuple ordered as METRIC_COLUMNS."""
+    values = record['metrics']
+    return (
+        record['station_id'],
+        parse_datetime(record['timestamp']),
+        values['output'],
+        values['temperature'],
+        values['voltage'],
+        values['efficiency'],
+    )
+
+
+def station_scope_columns(using='default'):
+    """{station_id: (region_id, country_id)} for every station, the SCOPE_COLUMNS of its metrics."""
+    return {
+        station_id: (region_id, country_id)
+        for station_id, region_id, country_id in Station.objects.using(using).values_list('id', *SCOPE_COLUMNS)
+    }
+
+
+def sync_metric_scope_columns(station_ids, using='default'):
+    """
+    Rewrites the region/country copied onto the given stations' metrics where
+    they no longer match the station, one indexed UPDATE per station. Every
+    path that moves a station to another region or country must call this:
+    Station.save() does through signals, bulk upserts and QuerySet.update()
+    have to do it themselves. Returns the number of metrics rewritten.
+    """
+    updated = 0
+    stations = Station.objects.using(using).filter(pk__in=station_ids).values_list('id', *SCOPE_COLUMNS)
+    for station_id, region_id, country_id in stations:
+        updated += DashboardMetric.objects.using(using).filter(station_id=station_id).exclude(
+            region_id=region_id, country_id=country_id,
+        ).update(region_id=region_id, country_id=country_id)
+    return updated
+
+
+def lock_metric_stations(rows, using='default'):
+    """
+    Takes a FOR SHARE lock on the stations of the given metric tuples until the
+    transaction ends. A concurrent move of one of them then waits for these
+    rows to commit, so its sync_metric_scope_columns() fixes them; or, if the
+    move came first, the insert reads the new region and country. Other
+    backends serialise writers and need no lock.
+    """
+    connection = connections[using]
+    station_ids = sorted({row[0] for row in rows})
+    if connection.vendor != 'postgresql' or not station_ids:
+        return
+    table = connection.ops.quote_name(Station._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM {table} WHERE id = ANY(%s) ORDER BY id FOR SHARE', [station_ids])
+
+
+def supports_copy(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def copy_metric_rows(rows, using='default'):
+    """
+    Writes metric tuples (METRIC_COLUMNS) with PostgreSQL's COPY FROM STDIN
+    (psycopg2 or psycopg 3). COPY can't look up the station, so the rows land in
+    a temporary table and are inserted from there joined to Station.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(value.isoformat() if hasattr(value, 'isoformat') else value for value in row)
+    buffer.seek(0)
+
+    table, stations = DashboardMetric._meta.db_table, Station._meta.db_table
+    columns = ', '.join(METRIC_COLUMNS)
+    sql = f'COPY metric_copy ({columns}) FROM STDIN WITH (FORMAT csv)'
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f'CREATE TEMPORARY TABLE metric_copy AS SELECT {columns} FROM {table} WITH NO DATA')
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, 'copy_expert'):
+            raw_cursor.copy_expert(sql, buffer)
+        else:
+            with raw_cursor.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+        cursor.execute(
+            f'INSERT INTO {table} ({", ".join(INSERT_COLUMNS)}) '
+            f'SELECT {", ".join(f"m.{column}" for column in METRIC_COLUMNS)}, s.region_id, s.country_id '
+            f'FROM metric_copy m LEFT JOIN {stations} s ON s.id = m.station_id'
+        )
+        cursor.execute('DROP TABLE metric_copy')
+
+
+def bulk_insert_metric_rows(rows, using='default'):
+    """
+    Writes metric tuples (METRIC_COLUMNS) with executemany, skipping model
+    instantiation. Region and country are read from Station by the INSERT itself.
+    """
+    connection = connections[using]
+    adapt_datetime = connection.ops.adapt_datetimefield_value
+    quote = connection.ops.quote_name
+    stations = quote(Station._meta.db_table)
+    columns = ', '.join(quote(column) for column in INSERT_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(METRIC_COLUMNS))
+    scope = ', '.join(f'(SELECT {quote(column)} FROM {stations} WHERE id = %s)' for column in SCOPE_COLUMNS)
+    sql = f'INSERT INTO {DashboardMetric._meta.db_table} ({columns}) VALUES ({placeholders}, {scope})'
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            sql, [(row[0], adapt_datetime(row[1]), *row[2:], *[row[0]] * len(SCOPE_COLUMNS)) for row in rows],
+        )
+
+
+# --- Latest reading per station ---
+def latest_metric_rows(rows):
+    """The newest of the given metric tuples for each station."""
+    latest = {}
+    for row in rows:
+        current = latest.get(row[0])
+        if current is None or row[1] >= current[1]:
+            latest[row[0]] = row
+    return list(latest.values())
+
+
+def upsert_latest_metrics(rows, using='default'):
+    """
+    Folds metric tuples into StationLatestMetric with one INSERT ... ON CONFLICT
+    per station. A stored reading is only replaced by one at least as new, so
+    late or out-of-order rows leave the snapshot alone.
+    """
+    rows = latest_metric_rows(rows)
+    if not rows:
+        return
+    connection = connections[using]
+    adapt_datetime = connection.ops.adapt_datetimefield_value
+    quote = connection.ops.quote_name
+    table = quote(StationLatestMetric._meta.db_table)
+    columns = ', '.join(quote(column) for column in METRIC_COLUMNS)
+    placeholders = ', '.join(['%s'] * len(METRIC_COLUMNS))
+    updates = ', '.join(f'{quote(column)} = EXCLUDED.{quote(column)}' for column in METRIC_COLUMNS[1:])
+    sql = (
+        f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) '
+        f'ON CONFLICT ({quote("station_id")}) DO UPDATE SET {updates} '
+        f'WHERE {table}.{quote("timestamp")} <= EXCLUDED.{quote("timestamp")}'
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [(row[0], adapt_datetime(row[1]), *row[2:]) for row in rows])
+
+
+def refresh_latest_metrics(station_ids, using='default'):
+    """
+    Recomputes the snapshot of the given stations from the raw table, for when
+    their newest metric was edited or deleted rather than superseded.
+    """
+    for station_id in station_ids:
+        row = (
+            DashboardMetric.objects.using(using).filter(station_id=station_id)
+            .order_by('-timestamp', '-id').values_list(*METRIC_COLUMNS).first()
+        )
+        if row is None:
+            StationLatestMetric.objects.using(using).filter(station_id=station_id).delete()
+        else:
+            StationLatestMetric.objects.using(using).update_or_create(
+                station_id=station_id, defaults=dict(zip(METRIC_COLUMNS[1:], row[1:])),
+            )
+
+
+def load_metric_rows(rows, batch_size=DEFAULT_BATCH_SIZE, use_copy=False, using='default', progress=None):
+    """
+    Writes an iterable of metric tuples in batches, keeping StationLatestMetric
+    current, and returns the number written. Each row's region and country are
+    read from its station as it is inserted (see lock_metric_stations).
+    `progress(total_rows, rows_per_sec)` is called after every batch.
+    """
+    write = copy_metric_rows if use_copy else bulk_insert_metric_rows
+    started = time.monotonic()
+    total = 0
+    for batch in batched(rows, batch_size):
+        # One transaction per batch, so autocommit backends don't commit every row.
+        with transaction.atomic(using=using):
+            lock_metric_stations(batch, using=using)
+            write(batch, using=using)
+            upsert_latest_metrics(batch, using=using)
+        total += len(batch)
+        if progress:
+            elapsed = time.monotonic() - started
+            progress(total, total / elapsed if elapsed else 0.0)
+    return total
+
+
+# --- Audit logs ---
+def audit_log_from_record(record):
+    """Builds an unsaved AuditLog from an audit_logs.json / NDJSON record."""
+    return AuditLog(
+        user_id=record['user_id'],
+        timestamp=parse_datetime(record['timestamp']),
+        action=record['action'],
+        target=record['target'],
+        details=record['details'],
+    )
+
+
+def load_audit_logs(records, valid_user_ids, batch_size=DEFAULT_BATCH_SIZE, using='default'):
+    """
+    Bulk-inserts audit records in batches, skipping those whose user is not in
+    valid_user_ids (prefetched once by the caller). Returns (loaded, skipped).
+    """
+    loaded = skipped = 0
+    for batch in batched(records, batch_size):
+        logs = [audit_log_from_record(record) for record in batch if record['user_id'] in valid_user_ids]
+        skipped += len(batch) - len(logs)
+        AuditLog.objects.using(using).bulk_create(logs)
+        loaded += len(logs)
+    return loaded, skipped
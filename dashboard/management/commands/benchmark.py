@@ -0,0 +1,58 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from dashboard.benchmarks import BenchmarkRunner, compare_results
+from dashboard.loaders import supports_copy
+
+
+class Command(BaseCommand):
+    help = ('Times the API per role, per-station metric history, ingestion, connection management and (optionally) load_data '
+            'against the current database and writes the results as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None,
+                            help='Results file (default: benchmark-<vendor>-<timestamp>.json in the current directory).')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case (default: 5).')
+        parser.add_argument('--stations', type=int, default=3, help='Stations whose history is timed (default: 3).')
+        parser.add_argument('--ingest-rows', type=int, default=10_000,
+                            help='Readings per ingestion request; the inserts are rolled back (default: 10000).')
+        parser.add_argument('--latency-requests', type=int, default=200,
+                            help='Requests timed per connection management mode (default: 200).')
+        parser.add_argument('--data-dir', default=None,
+                            help='Also time load_data --stream from this directory (e.g. a generate_fleet output). '
+                                 'This REPLACES the database contents.')
+        parser.add_argument('--compare', default=None, help='Earlier results file to check for regressions.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Median slowdown counted as a regression, as a fraction (default: 0.2).')
+
+    def handle(self, *args, **options):
+        runner = BenchmarkRunner(
+            repeat=options['repeat'], stations=options['stations'],
+            ingest_rows=options['ingest_rows'], latency_requests=options['latency_requests'], stdout=self.stdout,
+        )
+        results = runner.run(data_dir=options['data_dir'], use_copy=supports_copy())
+
+        output = options['output'] or (
+            f'benchmark-{connection.vendor}-{timezone.now():%Y%m%d-%H%M%S}.json'
+        )
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'{len(results["results"])} cases written to {os.path.abspath(output)}.'))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            if baseline['meta']['vendor'] != results['meta']['vendor']:
+                self.stdout.write(self.style.WARNING(
+                    f'Comparing {results["meta"]["vendor"]} results with a {baseline["meta"]["vendor"]} baseline.'
+                ))
+            regressions = compare_results(results, baseline, options['threshold'])
+            for name, before, after in regressions:
+                self.stdout.write(self.style.ERROR(f'  {name}: {before:.2f} ms -> {after:.2f} ms'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} case(s) regressed by more than {options["threshold"]:.0%}.')
+            self.stdout.write(self.style.SUCCESS(f'No regressions against {options["compare"]}.'))
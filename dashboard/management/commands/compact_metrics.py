@@ -0,0 +1,46 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.retention import DEFAULT_BATCH_SIZE, compact_metrics
+from dashboard.rollups import RETENTION_TIERS, retention_cutoff, retention_policy
+
+
+class Command(BaseCommand):
+    help = (
+        'Applies the metric retention policy: compacts raw metrics past their retention into the rollups, '
+        'deletes them, and expires old rollups. Safe to interrupt and rerun.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows deleted per transaction (default: {DEFAULT_BATCH_SIZE}).')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches, to leave room for other writers.')
+        parser.add_argument('--dry-run', action='store_true', help='Show the policy and cutoffs without deleting.')
+
+    def handle(self, *args, **options):
+        try:
+            policy = retention_policy()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        for tier in RETENTION_TIERS:
+            cutoff = retention_cutoff(tier)
+            kept = 'forever' if policy[tier] is None else f'{policy[tier]} days (before {cutoff.isoformat()} expires)'
+            self.stdout.write(f'  - {tier}: keep {kept}')
+        if options['dry_run']:
+            return
+
+        started = time.monotonic()
+        deleted = compact_metrics(batch_size=options['batch_size'], pause=options['pause'], progress=self.report)
+        elapsed = time.monotonic() - started
+        compacted = deleted.get('raw', 0)
+        rate = compacted / elapsed if elapsed else 0.0
+        expired = ', '.join(f'{count} {tier}' for tier, count in deleted.items() if tier != 'raw') or 'none'
+        self.stdout.write(self.style.SUCCESS(
+            f'{compacted} raw metrics compacted ({rate:,.0f} rows/sec); rollups expired: {expired}.'
+        ))
+
+    def report(self, tier, deleted):
+        self.stdout.write(f'  - {tier}: {deleted} rows deleted')
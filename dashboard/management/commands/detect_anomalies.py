@@ -0,0 +1,64 @@
+import time
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from dashboard.anomalies import DEFAULT_STEP, DEFAULT_ZSCORE_WINDOW, require_numpy, scan_stations
+
+
+class Command(BaseCommand):
+    help = 'Scans every station\'s recent metrics for z-score outliers, EWMA drift and threshold breaches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--window-hours', type=float, default=24,
+                            help='Hours of metrics to scan, ending at --end (default: 24).')
+        parser.add_argument('--end', default=None,
+                            help='ISO-8601 end of the scanned window (default: now).')
+        parser.add_argument('--step', type=int, default=DEFAULT_STEP,
+                            help=f'Seconds per time bucket; readings inside one are averaged (default: {DEFAULT_STEP}).')
+        parser.add_argument('--zscore-window', type=int, default=DEFAULT_ZSCORE_WINDOW,
+                            help=f'Preceding buckets each z-score is measured against (default: {DEFAULT_ZSCORE_WINDOW}).')
+        parser.add_argument('--dry-run', action='store_true', help='Report alerts without storing them.')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running as a worker, scanning the window ending now every N seconds.')
+
+    def handle(self, *args, **options):
+        try:
+            require_numpy()
+        except ImproperlyConfigured as e:
+            raise CommandError(str(e))
+        end = None
+        if options['end']:
+            end = parse_datetime(options['end'])
+            if end is None:
+                raise CommandError(f'Invalid --end timestamp: {options["end"]!r}')
+            if timezone.is_naive(end):
+                end = timezone.make_aware(end, dt_timezone.utc)
+
+        while True:
+            self.scan(end or timezone.now(), options)
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def scan(self, end, options):
+        started = time.monotonic()
+        grid, alerts = scan_stations(
+            end, window=timedelta(hours=options['window_hours']), step=options['step'],
+            zscore_window=options['zscore_window'], save=not options['dry_run'],
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f'Scanned {grid.readings:,} readings from {len(grid.station_ids):,} stations '
+            f'up to {end.isoformat()} in {elapsed:.2f}s.'
+        )
+        for (kind, severity), count in sorted(Counter((alert.kind, alert.severity) for alert in alerts).items()):
+            self.stdout.write(f'  - {kind} {severity}: {count}')
+        if options['dry_run']:
+            for alert in alerts:
+                self.stdout.write(f'    {alert.station_id} {alert.timestamp.isoformat()} {alert.message}')
+        self.stdout.write(self.style.SUCCESS(f'{len(alerts)} alerts{" (not stored)" if options["dry_run"] else ""}.'))
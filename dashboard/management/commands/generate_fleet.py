@@ -0,0 +1,53 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from dashboard.fleet import FleetSpec, write_fleet
+from dashboard.loaders import supports_copy
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic fleet (hierarchy, users, audit logs and per-minute metrics) as load_data JSON files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Directory to write the JSON files to.')
+        parser.add_argument('--countries', type=int, default=3)
+        parser.add_argument('--regions-per-country', type=int, default=2)
+        parser.add_argument('--stations-per-region', type=int, default=5)
+        parser.add_argument('--users-per-role', type=int, default=2,
+                            help='Users generated for each of Admin, Country Lead, Station Manager and Viewer.')
+        parser.add_argument('--months', type=float, default=1.0,
+                            help='Months (30 days) of metric history ending now (default: 1).')
+        parser.add_argument('--interval-minutes', type=int, default=1,
+                            help='Minutes between readings of each station (default: 1).')
+        parser.add_argument('--audit-logs', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; equal seeds give equal fleets.')
+        parser.add_argument('--load', action='store_true',
+                            help='Replace the database contents with the generated fleet (load_data --stream).')
+
+    def handle(self, *args, **options):
+        spec = FleetSpec(
+            countries=options['countries'],
+            regions_per_country=options['regions_per_country'],
+            stations_per_region=options['stations_per_region'],
+            users_per_role=options['users_per_role'],
+            months=options['months'],
+            interval_minutes=options['interval_minutes'],
+            audit_logs=options['audit_logs'],
+            seed=options['seed'],
+        )
+        self.stdout.write(
+            f'Generating {spec.station_count} stations x {spec.samples_per_station} readings '
+            f'({spec.metric_count:,} metrics) into {options["output"]}...'
+        )
+
+        started = time.monotonic()
+        write_fleet(spec, options['output'], progress=self.report)
+        self.stdout.write(self.style.SUCCESS(f'Fleet written in {time.monotonic() - started:.1f}s.'))
+
+        if options['load']:
+            call_command('load_data', stream=True, copy=supports_copy(), data_dir=options['output'], stdout=self.stdout)
+
+    def report(self, name, count):
+        self.stdout.write(f'  - {name}: {count:,} records')
@@ -0,0 +1,23 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from dashboard.loaders import DEFAULT_BATCH_SIZE, iter_ndjson, load_audit_logs
+
+
+class Command(BaseCommand):
+    help = 'Streams a newline-delimited JSON audit log export into the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to an NDJSON file with one audit log record per line.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows per bulk insert (default: {DEFAULT_BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        valid_user_ids = set(User.objects.values_list('id', flat=True))
+        try:
+            with open(options['path']) as f, transaction.atomic():
+                loaded, skipped = load_audit_logs(iter_ndjson(f), valid_user_ids, batch_size=options['batch_size'])
+        except FileNotFoundError:
+            raise CommandError(f"File not found: {options['path']}")
+        self.stdout.write(self.style.SUCCESS(f'{loaded} audit logs loaded ({skipped} skipped for unknown users).'))
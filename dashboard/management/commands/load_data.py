@@ -3,16 +3,46 @@ import os
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
 from dashboard.models import UserProfile, Country, Region, Station, DashboardMetric, AuditLog
 from django.utils.dateparse import parse_datetime
+from dashboard.loaders import (
+    DEFAULT_BATCH_SIZE, iter_json_array, load_audit_logs, load_metric_rows, metric_row, station_scope_columns,
+    supports_copy, sync_metric_scope_columns,
+)
+from dashboard.caching import invalidate_hierarchy_cache
+from dashboard.ingest import invalidate_known_stations
+from dashboard.scope import invalidate_all_scopes
+from dashboard.rollups import reset_rollups
 
 class Command(BaseCommand):
     help = 'Loads data from JSON files into the database'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--stream', action='store_true',
+                            help='Stream dashboard_metrics.json and insert metrics in batches instead of row by row.')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help=f'Rows per batch in --stream mode (default: {DEFAULT_BATCH_SIZE}).')
+        parser.add_argument('--copy', action='store_true',
+                            help='In --stream mode, write metrics with COPY FROM STDIN (PostgreSQL only).')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Upsert into the existing data instead of clearing it; only metrics newer '
+                                 'than each station\'s latest stored reading are inserted.')
+        parser.add_argument('--data-dir', default=None,
+                            help='Directory containing the JSON files (default: the data/ directory next to the project).')
+
     def handle(self, *args, **kwargs):
         # Define the path to the JSON files
         # FIX: Point to the 'data' directory which is a sibling of the project folder
-        data_path = os.path.join(settings.BASE_DIR.parent, 'data')
+        data_path = kwargs['data_dir'] or os.path.join(settings.BASE_DIR.parent, 'data')
+
+        if kwargs['incremental']:
+            with transaction.atomic():
+                self.load_incremental(data_path, kwargs['batch_size'], kwargs['copy'])
+            self.stdout.write(self.style.SUCCESS('Incremental data loading complete!'))
+            return
 
         # Clear existing data to prevent duplicates, in reverse order of dependency
         self.stdout.write('Clearing old data...')
@@ -23,6 +53,8 @@ class Command(BaseCommand):
         Station.objects.all().delete()
         Region.objects.all().delete()
         Country.objects.all().delete()
+        # Metric IDs may be reused after the clear, so the rollup watermark must start over.
+        reset_rollups()
         self.stdout.write(self.style.SUCCESS('Old data cleared.'))
 
         # --- Load Countries ---
@@ -79,33 +111,122 @@ class Command(BaseCommand):
 
         # --- Load Dashboard Metrics ---
         self.stdout.write('Loading dashboard metrics...')
-        with open(os.path.join(data_path, 'dashboard_metrics.json')) as f:
-            metrics_data = json.load(f)
-            for metric_data in metrics_data:
-                DashboardMetric.objects.create(
-                    station_id=metric_data['station_id'],
-                    timestamp=parse_datetime(metric_data['timestamp']),
-                    output=metric_data['metrics']['output'],
-                    temperature=metric_data['metrics']['temperature'],
-                    voltage=metric_data['metrics']['voltage'],
-                    efficiency=metric_data['metrics']['efficiency']
-                )
-        self.stdout.write(self.style.SUCCESS(f'{len(metrics_data)} metrics loaded.'))
+        if kwargs['stream']:
+            metrics_count = self.stream_metrics(
+                os.path.join(data_path, 'dashboard_metrics.json'), kwargs['batch_size'], kwargs['copy']
+            )
+            self.stdout.write(self.style.SUCCESS(f'{metrics_count} metrics loaded.'))
+        else:
+            with open(os.path.join(data_path, 'dashboard_metrics.json')) as f:
+                metrics_data = json.load(f)
+            # The bulk path, as per-row create() would also run the metric signals for every row.
+            metrics_count = load_metric_rows(
+                (metric_row(record) for record in metrics_data), batch_size=kwargs['batch_size'],
+            )
+            self.stdout.write(self.style.SUCCESS(f'{metrics_count} metrics loaded.'))
 
         # --- Load Audit Logs ---
         self.stdout.write('Loading audit logs...')
+        # Valid user IDs are fetched once; logs for unknown users are skipped and counted.
+        valid_user_ids = set(User.objects.values_list('id', flat=True))
         with open(os.path.join(data_path, 'audit_logs.json')) as f:
-            logs_data = json.load(f)
-            for log_data in logs_data:
-                # Ensure the user exists before creating the log
-                if User.objects.filter(id=log_data['user_id']).exists():
-                    AuditLog.objects.create(
-                        user_id=log_data['user_id'],
-                        timestamp=parse_datetime(log_data['timestamp']),
-                        action=log_data['action'],
-                        target=log_data['target'],
-                        details=log_data['details']
-                    )
-        self.stdout.write(self.style.SUCCESS(f'{len(logs_data)} audit logs loaded.'))
+            loaded, skipped = load_audit_logs(json.load(f), valid_user_ids, batch_size=kwargs['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{loaded} audit logs loaded ({skipped} skipped for unknown users).'))
 
         self.stdout.write(self.style.SUCCESS('Data loading complete!'))
+
+    def stream_metrics(self, path, batch_size, use_copy):
+        """Streams metric records from `path` into the database in batches, printing throughput."""
+        if use_copy and not supports_copy():
+            self.stdout.write(self.style.WARNING('COPY is only available on PostgreSQL; using bulk inserts.'))
+            use_copy = False
+
+        def progress(total, rate):
+            self.stdout.write(f'  - {total} rows ({rate:,.0f} rows/sec)')
+
+        with open(path) as f:
+            rows = (metric_row(record) for record in iter_json_array(f))
+            return load_metric_rows(rows, batch_size=batch_size, use_copy=use_copy, progress=progress)
+
+    # --- Incremental mode ---
+    def upsert(self, model, objects, update_fields):
+        model.objects.bulk_create(
+            objects, update_conflicts=True, unique_fields=['pk'], update_fields=update_fields,
+        )
+        return len(objects)
+
+    def load_incremental(self, data_path, batch_size, use_copy):
+        """Upserts the hierarchy and users by primary key and appends only new metrics and logs."""
+        def read(name):
+            with open(os.path.join(data_path, name)) as f:
+                return json.load(f)
+
+        count = self.upsert(Country, [Country(**c) for c in read('countries.json')], ['name'])
+        self.stdout.write(f'  - {count} countries upserted.')
+        count = self.upsert(Region, [Region(**r) for r in read('regions.json')], ['name', 'country'])
+        self.stdout.write(f'  - {count} regions upserted.')
+        # bulk_create sends no signals, so moved stations and the caches are handled here.
+        previous_scopes = station_scope_columns()
+        count = self.upsert(Station, [Station(**s) for s in read('stations.json')], ['name', 'region', 'country'])
+        self.stdout.write(f'  - {count} stations upserted.')
+        moved = [
+            station_id for station_id, scope in station_scope_columns().items()
+            if previous_scopes.get(station_id, scope) != scope
+        ]
+        if moved:
+            count = sync_metric_scope_columns(moved)
+            self.stdout.write(f'  - {len(moved)} moved stations, {count} of their metrics updated.')
+        invalidate_known_stations()
+        invalidate_all_scopes()
+        invalidate_hierarchy_cache()
+
+        # Passwords are only set on newly created users, and hashed once for all of them.
+        users_data = read('users.json')
+        default_password = make_password('password123')
+        auth_users = []
+        for user_data in users_data:
+            is_admin = user_data['role'] == 'Admin'
+            auth_users.append(User(
+                id=user_data['id'], username=user_data['email'], email=user_data['email'],
+                password=default_password, is_active=user_data['active'],
+                is_staff=is_admin, is_superuser=is_admin,
+            ))
+        self.upsert(User, auth_users, ['username', 'email', 'is_active', 'is_staff', 'is_superuser'])
+        profiles = [
+            UserProfile(
+                user_id=user_data['id'], role=user_data['role'], country_id=user_data.get('country'),
+                region_id=user_data.get('region'), station_id=user_data.get('station'),
+            )
+            for user_data in users_data
+        ]
+        count = self.upsert(UserProfile, profiles, ['role', 'country', 'region', 'station'])
+        self.stdout.write(f'  - {count} users and profiles upserted.')
+
+        # Metrics: only rows newer than each station's high-water mark.
+        high_water = dict(
+            DashboardMetric.objects.order_by().values('station_id')
+            .annotate(latest=Max('timestamp')).values_list('station_id', 'latest')
+        )
+        if use_copy and not supports_copy():
+            use_copy = False
+
+        def progress(total, rate):
+            self.stdout.write(f'  - {total} new metrics ({rate:,.0f} rows/sec)')
+
+        with open(os.path.join(data_path, 'dashboard_metrics.json')) as f:
+            rows = (
+                row for row in (metric_row(record) for record in iter_json_array(f))
+                if row[0] not in high_water or row[1] > high_water[row[0]]
+            )
+            count = load_metric_rows(rows, batch_size=batch_size, use_copy=use_copy, progress=progress)
+        self.stdout.write(f'  - {count} new metrics inserted.')
+
+        # Audit logs: only entries newer than the latest stored one.
+        latest_log = AuditLog.objects.aggregate(latest=Max('timestamp'))['latest']
+        valid_user_ids = set(User.objects.values_list('id', flat=True))
+        new_records = (
+            log_data for log_data in read('audit_logs.json')
+            if latest_log is None or parse_datetime(log_data['timestamp']) > latest_log
+        )
+        loaded, skipped = load_audit_logs(new_records, valid_user_ids, batch_size=batch_size)
+        self.stdout.write(f'  - {loaded} new audit logs inserted ({skipped} skipped for unknown users).')
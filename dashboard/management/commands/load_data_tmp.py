@@ -8,6 +8,7 @@ from django.contrib.auth.models import User
 from dashboard.models import UserProfile, Country, Region, Station, DashboardMetric, AuditLog
 from django.utils.dateparse import parse_datetime
 from django.db import connection
+from dashboard.loaders import load_audit_logs
 
 class Command(BaseCommand):
     help = 'Loads data from JSON files into the database and resets sequences'
@@ -98,18 +99,10 @@ class Command(BaseCommand):
 
         # --- Load Audit Logs ---
         self.stdout.write('Loading audit logs...')
+        valid_user_ids = set(User.objects.values_list('id', flat=True))
         with open(os.path.join(data_path, 'audit_logs.json')) as f:
-            logs_data = json.load(f)
-            for log_data in logs_data:
-                if User.objects.filter(id=log_data['user_id']).exists():
-                    AuditLog.objects.create(
-                        user_id=log_data['user_id'],
-                        timestamp=parse_datetime(log_data['timestamp']),
-                        action=log_data['action'],
-                        target=log_data['target'],
-                        details=log_data['details']
-                    )
-        self.stdout.write(self.style.SUCCESS(f'{len(logs_data)} audit logs loaded.'))
+            loaded, skipped = load_audit_logs(json.load(f), valid_user_ids)
+        self.stdout.write(self.style.SUCCESS(f'{loaded} audit logs loaded ({skipped} skipped for unknown users).'))
         
         # --- Reset primary key sequence for the User table ---
         self.stdout.write(self.style.WARNING('Resetting database sequence for User model...'))
@@ -0,0 +1,200 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+TABLE = 'dashboard_dashboardmetric'
+LEGACY_TABLE = f'{TABLE}_legacy'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(day, offset=0):
+    """First day of the month `offset` months after the month containing `day`."""
+    index = day.year * 12 + (day.month - 1) + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(start):
+    return f'{TABLE}_p{start:%Y%m}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Manages monthly range partitions of the dashboard metrics table (PostgreSQL only). '
+        'Use --convert once to turn the existing table into a partitioned one, then run '
+        'regularly (e.g. daily from cron) to create upcoming partitions and expire old ones.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true',
+                            help='Convert the existing metrics table into a partitioned table (locks the table while copying).')
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of future monthly partitions to keep created (default: 3).')
+        parser.add_argument('--retain-months', type=int, default=None,
+                            help='Detach partitions whose data is entirely older than this many months.')
+        parser.add_argument('--drop-expired', action='store_true',
+                            help='Drop expired partitions instead of only detaching them.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Metric partitioning requires PostgreSQL.')
+
+        if options['convert']:
+            self.convert_table(options['months_ahead'])
+        elif not self.is_partitioned():
+            raise CommandError(f'{TABLE} is not partitioned yet. Run with --convert first.')
+        else:
+            self.ensure_partitions(month_start(timezone.now().date()), options['months_ahead'])
+
+        if options['retain_months'] is not None:
+            self.expire_partitions(options['retain_months'], options['drop_expired'])
+
+        self.stdout.write(self.style.SUCCESS('Partition maintenance complete.'))
+
+    # --- Introspection ---
+    def is_partitioned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT relkind FROM pg_class WHERE relname = %s', [TABLE])
+            row = cursor.fetchone()
+        return row is not None and row[0] == 'p'
+
+    def existing_partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE parent.relname = %s
+                """,
+                [TABLE],
+            )
+            return {row[0] for row in cursor.fetchall()}
+
+    # --- Partition creation ---
+    @transaction.atomic
+    def create_partition(self, cursor, start, has_default=True):
+        """
+        Creates the partition for the month starting at `start`. PostgreSQL refuses
+        while the default partition holds rows of that month (e.g. from clock-skewed
+        ingest), so those are moved: the default is detached, the new partition
+        created and filled from it, and the default re-attached.
+        """
+        end = month_start(start, 1)
+        name = partition_name(start)
+        bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        in_month = '"timestamp" >= %s AND "timestamp" < %s'
+        stray = False
+        if has_default:
+            cursor.execute(f'SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_month} LIMIT 1', [start, end])
+            stray = cursor.fetchone() is not None
+        if not stray:
+            cursor.execute(f'CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} {bounds}')
+            return 0
+
+        cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+        cursor.execute(f'CREATE TABLE {name} PARTITION OF {TABLE} {bounds}')
+        cursor.execute(
+            f'INSERT INTO {name} OVERRIDING SYSTEM VALUE SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}',
+            [start, end],
+        )
+        moved = cursor.rowcount
+        cursor.execute(f'DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}', [start, end])
+        cursor.execute(f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT')
+        return moved
+
+    def ensure_partitions(self, first_month, months_ahead):
+        """
+        Creates monthly partitions from first_month up to months_ahead past the
+        current month. A month that fails is reported and skipped, so the rest
+        of the maintenance run (e.g. expiry) still happens.
+        """
+        existing = self.existing_partitions()
+        has_default = DEFAULT_PARTITION in existing
+        last_month = month_start(timezone.now().date(), months_ahead)
+        created = moved = failed = 0
+        with connection.cursor() as cursor:
+            start = first_month
+            while start <= last_month:
+                if partition_name(start) not in existing:
+                    try:
+                        moved += self.create_partition(cursor, start, has_default)
+                    except DatabaseError as exc:
+                        failed += 1
+                        self.stderr.write(f'  - Could not create the {start:%Y-%m} partition: {exc}')
+                    else:
+                        created += 1
+                start = month_start(start, 1)
+        self.stdout.write(f'  - {created} partition(s) created up to {last_month:%Y-%m}.')
+        if moved:
+            self.stdout.write(f'  - {moved} row(s) moved out of the default partition.')
+        if failed:
+            self.stdout.write(self.style.WARNING(f'  - {failed} partition(s) could not be created.'))
+
+    # --- One-off conversion ---
+    @transaction.atomic
+    def convert_table(self, months_ahead):
+        if self.is_partitioned():
+            raise CommandError(f'{TABLE} is already partitioned.')
+
+        self.stdout.write(f'Converting {TABLE} into a monthly partitioned table...')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s',
+                [TABLE, f'{TABLE}_pkey'],
+            )
+            index_definitions = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'SELECT MIN("timestamp") FROM {TABLE}')
+            first_timestamp = cursor.fetchone()[0]
+
+            cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}')
+            # The partition key must be part of every unique constraint, so the
+            # primary key becomes (id, timestamp). The identity sequence is recreated.
+            cursor.execute(
+                f'CREATE TABLE {TABLE} ('
+                f'  LIKE {LEGACY_TABLE} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS,'
+                f'  PRIMARY KEY (id, "timestamp")'
+                f') PARTITION BY RANGE ("timestamp")'
+            )
+            # LIKE does not copy foreign keys.
+            for column, target in (('station_id', 'dashboard_station'), ('region_id', 'dashboard_region'),
+                                   ('country_id', 'dashboard_country')):
+                cursor.execute(
+                    f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_{column}_fk '
+                    f'FOREIGN KEY ({column}) REFERENCES {target} (id) DEFERRABLE INITIALLY DEFERRED'
+                )
+            # Rows outside every monthly range land here instead of failing the insert.
+            cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT')
+
+        current = month_start(timezone.now().date())
+        first_month = month_start(first_timestamp.date()) if first_timestamp else current
+        self.ensure_partitions(min(first_month, current), months_ahead)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'INSERT INTO {TABLE} OVERRIDING SYSTEM VALUE SELECT * FROM {LEGACY_TABLE}')
+            self.stdout.write(f'  - {cursor.rowcount} rows copied.')
+            cursor.execute(f'DROP TABLE {LEGACY_TABLE}')
+            for definition in index_definitions:
+                cursor.execute(definition.replace(' ONLY ', ' '))
+            cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), "
+                f'COALESCE((SELECT MAX(id) FROM {TABLE}), 0) + 1, false)'
+            )
+        self.stdout.write(self.style.SUCCESS(f'{TABLE} is now partitioned by month.'))
+
+    # --- Expiry ---
+    def expire_partitions(self, retain_months, drop):
+        cutoff = month_start(timezone.now().date(), -retain_months)
+        expired = sorted(
+            name for name in self.existing_partitions()
+            if name != DEFAULT_PARTITION and name < partition_name(cutoff)
+        )
+        with connection.cursor() as cursor:
+            for name in expired:
+                cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+                if drop:
+                    cursor.execute(f'DROP TABLE {name}')
+        verb = 'dropped' if drop else 'detached'
+        self.stdout.write(f'  - {len(expired)} partition(s) older than {cutoff:%Y-%m} {verb}.')
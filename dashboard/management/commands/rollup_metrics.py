@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.retention import compacted_cutoff, expire_raw_metrics
+from dashboard.rollups import DEFAULT_CHUNK_SIZE, reset_rollups, update_rollups
+
+
+class Command(BaseCommand):
+    help = 'Folds new dashboard metrics into the 5-minute, hourly and daily per-station rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backfill', action='store_true',
+                            help='Discard existing rollups and rebuild them from the full metric history.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help=f'Raw metric IDs processed per transaction (default: {DEFAULT_CHUNK_SIZE}).')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running as a worker, checking for new metrics every N seconds.')
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            cutoff = compacted_cutoff()
+            if cutoff is None:
+                self.stdout.write('Resetting rollups for a full backfill...')
+                reset_rollups()
+            else:
+                # Rollups before the cutoff are the only copy of compacted history; rebuild the rest.
+                self.stdout.write(f'Resetting rollups from {cutoff.isoformat()} (older metrics were compacted)...')
+                expire_raw_metrics(cutoff)
+                reset_rollups(since=cutoff)
+
+        while True:
+            started = time.monotonic()
+            processed = update_rollups(chunk_size=options['chunk_size'], progress=self.report)
+            elapsed = time.monotonic() - started
+            rate = processed / elapsed if elapsed else 0.0
+            self.stdout.write(self.style.SUCCESS(f'{processed} metrics rolled up ({rate:,.0f} rows/sec).'))
+            if options['interval'] is None:
+                return
+            time.sleep(options['interval'])
+
+    def report(self, processed, watermark):
+        self.stdout.write(f'  - {processed} rows processed (watermark at id {watermark})')
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:10
+
+from django.db import migrations, models
+
+
+BRIN_INDEX_NAME = 'metric_timestamp_brin_idx'
+
+
+def create_brin_index(apps, schema_editor):
+    # BRIN is PostgreSQL-only; other backends rely on the composite index.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {BRIN_INDEX_NAME} '
+        f'ON dashboard_dashboardmetric USING brin ("timestamp")'
+    )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {BRIN_INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dashboardmetric',
+            index=models.Index(fields=['station', '-timestamp'], name='metric_station_ts_idx'),
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+    ]
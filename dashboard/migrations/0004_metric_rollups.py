@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StationMetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('1h', 'Hourly'), ('1d', 'Daily')], max_length=4)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.BigIntegerField()),
+                ('output_sum', models.FloatField()),
+                ('output_min', models.FloatField()),
+                ('output_max', models.FloatField()),
+                ('temperature_sum', models.FloatField()),
+                ('temperature_min', models.FloatField()),
+                ('temperature_max', models.FloatField()),
+                ('voltage_sum', models.FloatField()),
+                ('voltage_min', models.FloatField()),
+                ('voltage_max', models.FloatField()),
+                ('efficiency_sum', models.FloatField()),
+                ('efficiency_min', models.FloatField()),
+                ('efficiency_max', models.FloatField()),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='dashboard.station')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='rollup_granularity_bucket_idx')],
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'station', 'bucket'), name='unique_rollup_bucket')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:37
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_auditlog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('detected_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('metric', models.CharField(max_length=20)),
+                ('kind', models.CharField(choices=[('zscore', 'Rolling z-score'), ('drift', 'EWMA drift'), ('threshold', 'Threshold breach')], max_length=10)),
+                ('severity', models.CharField(choices=[('warning', 'Warning'), ('critical', 'Critical')], max_length=10)),
+                ('value', models.FloatField()),
+                ('score', models.FloatField()),
+                ('message', models.CharField(max_length=255)),
+                ('station', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alerts', to='dashboard.station')),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['-timestamp', '-id'], name='alert_ts_id_idx')],
+                'constraints': [models.UniqueConstraint(fields=('station', 'metric', 'kind', 'timestamp'), name='unique_station_alert')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:49
+
+from django.db import migrations, models
+
+
+def rewind_rollups(apps, schema_editor):
+    # Existing rollups have no 5-minute tier. Clearing them rewinds the watermark,
+    # so reads use raw rows until the next rollup_metrics run rebuilds every tier.
+    using = schema_editor.connection.alias
+    apps.get_model('dashboard', 'StationMetricRollup').objects.using(using).all().delete()
+    apps.get_model('dashboard', 'RollupWatermark').objects.using(using).update(last_id=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_station_alerts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRetention',
+            fields=[
+                ('tier', models.CharField(max_length=4, primary_key=True, serialize=False)),
+                ('cutoff', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='stationmetricrollup',
+            name='granularity',
+            field=models.CharField(choices=[('5m', '5-minute'), ('1h', 'Hourly'), ('1d', 'Daily')], max_length=4),
+        ),
+        migrations.RunPython(rewind_rollups, migrations.RunPython.noop),
+    ]
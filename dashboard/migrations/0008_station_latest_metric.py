@@ -0,0 +1,45 @@
+# Generated by Django 5.2.4 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LATEST_FIELDS = ('timestamp', 'output', 'temperature', 'voltage', 'efficiency')
+
+
+def backfill_latest_metrics(apps, schema_editor):
+    # One (station, -timestamp) index lookup per station rather than a scan of the history.
+    using = schema_editor.connection.alias
+    Station = apps.get_model('dashboard', 'Station')
+    DashboardMetric = apps.get_model('dashboard', 'DashboardMetric')
+    StationLatestMetric = apps.get_model('dashboard', 'StationLatestMetric')
+    snapshots = []
+    for station_id in Station.objects.using(using).values_list('id', flat=True).iterator():
+        row = (
+            DashboardMetric.objects.using(using).filter(station_id=station_id)
+            .order_by('-timestamp', '-id').values(*LATEST_FIELDS).first()
+        )
+        if row is not None:
+            snapshots.append(StationLatestMetric(station_id=station_id, **row))
+    StationLatestMetric.objects.using(using).bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_metric_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationLatestMetric',
+            fields=[
+                ('station', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='latest_metric', serialize=False, to='dashboard.station')),
+                ('timestamp', models.DateTimeField()),
+                ('output', models.FloatField()),
+                ('temperature', models.FloatField()),
+                ('voltage', models.FloatField()),
+                ('efficiency', models.FloatField()),
+            ],
+        ),
+        migrations.RunPython(backfill_latest_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:03
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+
+# Metric ids updated per transaction, so the backfill never holds locks for long.
+BACKFILL_BATCH_SIZE = 10_000
+
+
+def backfill_scope_columns(apps, schema_editor):
+    # Copies each metric's station region/country, one id range per transaction.
+    # Resuming after an interruption only repeats the unfinished range.
+    using = schema_editor.connection.alias
+    Station = apps.get_model('dashboard', 'Station')
+    DashboardMetric = apps.get_model('dashboard', 'DashboardMetric')
+    station = Station.objects.using(using).filter(pk=OuterRef('station_id'))
+    metrics = DashboardMetric.objects.using(using)
+    bounds = metrics.aggregate(first=Min('id'), last=Max('id'))
+    if bounds['first'] is None:
+        return
+    for start in range(bounds['first'], bounds['last'] + 1, BACKFILL_BATCH_SIZE):
+        with transaction.atomic(using=using):
+            metrics.filter(id__gte=start, id__lt=start + BACKFILL_BATCH_SIZE, country__isnull=True).update(
+                region_id=Subquery(station.values('region_id')[:1]),
+                country_id=Subquery(station.values('country_id')[:1]),
+            )
+
+
+class Migration(migrations.Migration):
+    # Each backfill batch commits on its own.
+    atomic = False
+
+    dependencies = [
+        ('dashboard', '0008_station_latest_metric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dashboardmetric',
+            name='country',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dashboard.country'),
+        ),
+        migrations.AddField(
+            model_name='dashboardmetric',
+            name='region',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='dashboard.region'),
+        ),
+        migrations.RunPython(backfill_scope_columns, migrations.RunPython.noop),
+        # Built after the backfill, so the updates above don't have to maintain them.
+        migrations.AddIndex(
+            model_name='dashboardmetric',
+            index=models.Index(fields=['country', '-timestamp'], name='metric_country_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dashboardmetric',
+            index=models.Index(fields=['region', '-timestamp'], name='metric_region_ts_idx'),
+        ),
+    ]
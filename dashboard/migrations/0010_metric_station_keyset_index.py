@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-17 00:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_metric_scope_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dashboardmetric',
+            index=models.Index(fields=['station', '-timestamp', '-id'], name='metric_station_ts_id_idx'),
+        ),
+        # Dropped after the replacement exists, so station queries always have an index.
+        migrations.RemoveIndex(
+            model_name='dashboardmetric',
+            name='metric_station_ts_idx',
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User as AuthUser
 
 # It's best practice to use Django's built-in User model for authentication
@@ -66,9 +67,24 @@ class DashboardMetric(models.Model):
     temperature = models.FloatField()
     voltage = models.FloatField()
     efficiency = models.FloatField()
+    # Copies of the station's region and country, kept in step on every write, so
+    # country-wide scopes filter metrics without a join or a list of stations.
+    # Metrics are deleted through their station, hence DO_NOTHING.
+    region = models.ForeignKey(Region, on_delete=models.DO_NOTHING, null=True, related_name='+', db_index=False)
+    country = models.ForeignKey(Country, on_delete=models.DO_NOTHING, null=True, related_name='+', db_index=False)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Serves per-station "latest N", time-range queries and keyset pages without a sort.
+            # A BRIN index on timestamp is added on PostgreSQL in migration 0002.
+            models.Index(fields=['station', '-timestamp', '-id'], name='metric_station_ts_id_idx'),
+            # The same for country- and region-wide scopes.
+            models.Index(fields=['country', '-timestamp'], name='metric_country_ts_idx'),
+            models.Index(fields=['region', '-timestamp'], name='metric_region_ts_idx'),
+            # Keyset pagination order for the unfiltered metric list.
+            models.Index(fields=['-timestamp', '-id'], name='metric_ts_id_idx'),
+        ]
 
     def __str__(self):
         return f"Metrics for {self.station.name} at {self.timestamp}"
@@ -77,13 +93,124 @@ class AuditLog(models.Model):
     """Logs significant actions performed by users."""
     # FIX: Changed ForeignKey to point to the built-in AuthUser for clarity.
     user = models.ForeignKey(AuthUser, on_delete=models.CASCADE)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # A default rather than auto_now_add, so bulk loads and queued events keep their own time.
+    timestamp = models.DateTimeField(default=timezone.now)
     action = models.CharField(max_length=100)
     target = models.CharField(max_length=255)
     details = models.TextField(blank=True)
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Keyset pagination order for the audit log.
+            models.Index(fields=['-timestamp', '-id'], name='auditlog_ts_id_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.action}"
+
+class StationMetricRollup(models.Model):
+    """Pre-aggregated DashboardMetric statistics per station and time bucket."""
+    GRANULARITY_CHOICES = [
+        ('5m', '5-minute'),
+        ('1h', 'Hourly'),
+        ('1d', 'Daily'),
+    ]
+
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name='rollups')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket = models.DateTimeField()
+    count = models.BigIntegerField()
+    output_sum = models.FloatField()
+    output_min = models.FloatField()
+    output_max = models.FloatField()
+    temperature_sum = models.FloatField()
+    temperature_min = models.FloatField()
+    temperature_max = models.FloatField()
+    voltage_sum = models.FloatField()
+    voltage_min = models.FloatField()
+    voltage_max = models.FloatField()
+    efficiency_sum = models.FloatField()
+    efficiency_min = models.FloatField()
+    efficiency_max = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'station', 'bucket'], name='unique_rollup_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['granularity', 'bucket'], name='rollup_granularity_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.granularity} rollup for {self.station_id} at {self.bucket}"
+
+class RollupWatermark(models.Model):
+    """Highest DashboardMetric id already folded into the rollups."""
+    name = models.CharField(max_length=50, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
+
+
+class MetricRetention(models.Model):
+    """How far compaction has expired a metric tier ('raw' or a rollup granularity)."""
+    tier = models.CharField(max_length=4, primary_key=True)
+    # Everything in the tier before this time has been deleted.
+    cutoff = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tier} compacted before {self.cutoff}"
+
+
+class StationAlert(models.Model):
+    """An anomaly found in a station's metrics by the detection scan (dashboard/anomalies.py)."""
+    KIND_CHOICES = [
+        ('zscore', 'Rolling z-score'),
+        ('drift', 'EWMA drift'),
+        ('threshold', 'Threshold breach'),
+    ]
+    SEVERITY_CHOICES = [
+        ('warning', 'Warning'),
+        ('critical', 'Critical'),
+    ]
+
+    station = models.ForeignKey(Station, on_delete=models.CASCADE, related_name='alerts')
+    # Time of the reading the alert points at (the worst one in the scanned window).
+    timestamp = models.DateTimeField()
+    detected_at = models.DateTimeField(default=timezone.now)
+    metric = models.CharField(max_length=20)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES)
+    value = models.FloatField()
+    score = models.FloatField()
+    message = models.CharField(max_length=255)
+
+    class Meta:
+        ordering = ['-timestamp']
+        constraints = [
+            # Rescanning an overlapping window must not duplicate alerts.
+            models.UniqueConstraint(fields=['station', 'metric', 'kind', 'timestamp'], name='unique_station_alert'),
+        ]
+        indexes = [
+            models.Index(fields=['-timestamp', '-id'], name='alert_ts_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.severity} {self.kind} alert on {self.station_id} {self.metric} at {self.timestamp}"
+
+
+class StationLatestMetric(models.Model):
+    """Each station's most recent DashboardMetric, upserted as metrics are written (see loaders.upsert_latest_metrics)."""
+    station = models.OneToOneField(Station, on_delete=models.CASCADE, primary_key=True, related_name='latest_metric')
+    timestamp = models.DateTimeField()
+    output = models.FloatField()
+    temperature = models.FloatField()
+    voltage = models.FloatField()
+    efficiency = models.FloatField()
+
+    def __str__(self):
+        return f"Latest metrics for {self.station_id} at {self.timestamp}"
@@ -0,0 +1,217 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open-ended.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Query shapes kept per endpoint for the N+1 report.
+N_PLUS_ONE_REPORT_SIZE = 10
+
+_IN_LIST = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def query_shape(sql):
+    """Normalizes a parameterized SQL statement so repeats differing only in parameters compare equal."""
+    return _WHITESPACE.sub(' ', _IN_LIST.sub('(...)', sql)).strip()
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries, their time and their shapes."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[query_shape(sql)] += 1
+
+
+class EndpointStats:
+    """Rolling window of the most recent samples for one endpoint."""
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.total_requests = 0
+        self.n_plus_one = Counter()
+
+    def add(self, sample, repeated_shapes):
+        self.samples.append(sample)
+        self.total_requests += 1
+        self.n_plus_one.update(repeated_shapes)
+
+    def snapshot(self):
+        samples = list(self.samples)
+        totals = sorted(sample['total_ms'] for sample in samples)
+        histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        for value in totals:
+            histogram[_bucket_index(value)] += 1
+        return {
+            'requests': self.total_requests,
+            'window': len(samples),
+            'latency_ms': {
+                'p50': _percentile(totals, 0.5),
+                'p95': _percentile(totals, 0.95),
+                'p99': _percentile(totals, 0.99),
+                'max': totals[-1] if totals else None,
+                'histogram': {
+                    _bucket_label(index): count for index, count in enumerate(histogram)
+                },
+            },
+            'queries': _distribution([sample['queries'] for sample in samples]),
+            'db_ms': _distribution([sample['db_ms'] for sample in samples]),
+            'render_ms': _distribution([sample['render_ms'] for sample in samples]),
+            'response_bytes': _distribution([
+                sample['bytes'] for sample in samples if sample['bytes'] is not None
+            ]),
+            'n_plus_one': [
+                {'query': shape, 'requests': count}
+                for shape, count in self.n_plus_one.most_common(N_PLUS_ONE_REPORT_SIZE)
+            ],
+        }
+
+
+def _bucket_index(value):
+    for index, bound in enumerate(LATENCY_BUCKETS_MS):
+        if value <= bound:
+            return index
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _bucket_label(index):
+    if index < len(LATENCY_BUCKETS_MS):
+        return f'le_{LATENCY_BUCKETS_MS[index]}'
+    return f'gt_{LATENCY_BUCKETS_MS[-1]}'
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def _distribution(values):
+    if not values:
+        return {'avg': None, 'max': None}
+    return {'avg': sum(values) / len(values), 'max': max(values)}
+
+
+class PerfRegistry:
+    """Process-wide per-endpoint statistics; reset on restart."""
+
+    def __init__(self, window):
+        self.window = window
+        self._lock = threading.Lock()
+        self._endpoints = defaultdict(lambda: EndpointStats(self.window))
+
+    def record(self, endpoint, sample, repeated_shapes):
+        with self._lock:
+            self._endpoints[endpoint].add(sample, repeated_shapes)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: stats.snapshot() for endpoint, stats in sorted(self._endpoints.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = PerfRegistry(getattr(settings, 'PERF_WINDOW_SIZE', 1000))
+
+
+def perf_enabled():
+    return getattr(settings, 'PERF_INSTRUMENTATION', False)
+
+
+def n_plus_one_threshold():
+    return getattr(settings, 'PERF_N_PLUS_ONE_THRESHOLD', 10)
+
+
+class PerfMiddleware:
+    """
+    Records SQL query count and time, view time, rendering (serialization) time
+    and response size for every request that resolves to a view. The numbers are
+    sent back as a Server-Timing header and added to the rolling per-endpoint
+    statistics in `registry` (served by /api/_perf/). A query shape that repeats
+    more than PERF_N_PLUS_ONE_THRESHOLD times in one request is logged as a likely N+1.
+
+    Only installed when settings.PERF_INSTRUMENTATION is true.
+    """
+
+    def __init__(self, get_response):
+        if not perf_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = n_plus_one_threshold()
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request._perf = {'render_started': None, 'render_ended': None}
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        timings = request._perf
+        render = 0.0
+        if timings['render_started'] is not None and timings['render_ended'] is not None:
+            render = timings['render_ended'] - timings['render_started']
+        size = None if response.streaming else len(response.content)
+        repeated = [shape for shape, count in recorder.shapes.items() if count > self.threshold]
+
+        endpoint = f'{request.method} {match.view_name}'
+        for shape in repeated:
+            logger.warning(
+                'Possible N+1 on %s: query repeated %d times: %s', endpoint, recorder.shapes[shape], shape,
+            )
+
+        sample = {
+            'total_ms': total * 1000,
+            'db_ms': recorder.duration * 1000,
+            'render_ms': render * 1000,
+            'queries': recorder.count,
+            'bytes': size,
+        }
+        registry.record(endpoint, sample, repeated)
+
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={sample["db_ms"]:.2f};desc="{recorder.count} queries"',
+            f'app;dur={max(0.0, total - recorder.duration - render) * 1000:.2f}',
+            f'render;dur={sample["render_ms"]:.2f}',
+            f'total;dur={sample["total_ms"]:.2f}',
+        ])
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; time the render itself.
+        timings = request._perf
+        timings['render_started'] = time.perf_counter()
+
+        def render_finished(rendered):
+            timings['render_ended'] = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
@@ -0,0 +1,69 @@
+import threading
+import weakref
+from collections import Counter
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Per-process counters, keyed by database alias.
+_connects = Counter()
+_wrappers = weakref.WeakSet()
+_lock = threading.Lock()
+
+
+@receiver(connection_created)
+def track_connection(sender, connection, **kwargs):
+    # Fires for every connect: a new server connection, or a checkout when pooled.
+    with _lock:
+        _connects[connection.alias] += 1
+        _wrappers.add(connection)
+
+
+def connection_mode(settings_dict):
+    if settings_dict.get('OPTIONS', {}).get('pool'):
+        return 'pool'
+    return 'per-request' if settings_dict.get('CONN_MAX_AGE') == 0 else 'persistent'
+
+
+def pool_stats(connection):
+    """In use/waiting/created figures from a psycopg connection pool, plus its raw counters."""
+    stats = connection.pool.get_stats()
+    size, available = stats.get('pool_size', 0), stats.get('pool_available', 0)
+    return {
+        'size': size,
+        'min_size': stats.get('pool_min'),
+        'max_size': stats.get('pool_max'),
+        'in_use': size - available,
+        'idle': available,
+        'waiting': stats.get('requests_waiting', 0),
+        'created': stats.get('connections_num', 0),
+        'counters': stats,
+    }
+
+
+def connection_stats():
+    """
+    {alias: stats} for this process: how connections are managed, how often
+    Django connected, how many connections are open across threads and, for
+    pooled aliases, the pool's own figures.
+    """
+    with _lock:
+        connects = dict(_connects)
+        wrappers = list(_wrappers)
+    open_connections = Counter(wrapper.alias for wrapper in wrappers if wrapper.connection is not None)
+
+    stats = {}
+    for alias in connections:
+        settings_dict = connections.settings[alias]
+        mode = connection_mode(settings_dict)
+        stats[alias] = {
+            'vendor': connections[alias].vendor,
+            'mode': mode,
+            'conn_max_age': settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': settings_dict.get('CONN_HEALTH_CHECKS'),
+            'connects': connects.get(alias, 0),
+            'open': open_connections[alias],
+            'pool': pool_stats(connections[alias]) if mode == 'pool' else None,
+        }
+    return stats
@@ -0,0 +1,156 @@
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Set after a client's own write; until it expires their reads stay on the primary.
+PIN_COOKIE = 'db_primary_until'
+DEFAULT_PIN_SECONDS = 5.0
+# How long a replica that failed to connect is skipped before it is tried again.
+DEFAULT_RETRY_SECONDS = 30.0
+# Only these apps' models are read from replicas. Sessions and users stay on the
+# primary, so a login is never lost to replication lag.
+REPLICA_APPS = ('dashboard',)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+class ReplicaPool:
+    """
+    Round-robin over the replica aliases, skipping any that recently failed to
+    connect. choose() returns None when no replica is usable, so callers fall
+    back to the primary.
+    """
+
+    def __init__(self, aliases, retry_seconds=DEFAULT_RETRY_SECONDS):
+        self.aliases = list(aliases)
+        self.retry_seconds = retry_seconds
+        self._down_until = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def choose(self):
+        with self._lock:
+            start = self._next
+            self._next = (self._next + 1) % len(self.aliases) if self.aliases else 0
+        now = time.monotonic()
+        for offset in range(len(self.aliases)):
+            alias = self.aliases[(start + offset) % len(self.aliases)]
+            if self._down_until.get(alias, 0) > now:
+                continue
+            try:
+                connections[alias].ensure_connection()
+            except DatabaseError:
+                logger.warning('Read replica %r is unavailable; skipping it for %ss.', alias, self.retry_seconds,
+                               exc_info=True)
+                self.mark_down(alias)
+                continue
+            self._down_until.pop(alias, None)
+            return alias
+        return None
+
+    def mark_down(self, alias):
+        self._down_until[alias] = time.monotonic() + self.retry_seconds
+
+
+pool = ReplicaPool(replica_aliases(), getattr(settings, 'REPLICA_RETRY_SECONDS', DEFAULT_RETRY_SECONDS))
+
+
+# --- Routing ---
+class ReplicaReads:
+    """Marks the current request as allowed to read from a replica; the replica is chosen on first use."""
+
+    def __init__(self):
+        self.alias = None
+
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=None)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a replica while ReplicaRoutingMiddleware has marked the
+    current request for it (safe methods on views with read_from_replica), and
+    everything else to the primary. One replica serves the whole request, so
+    its reads see a single consistent snapshot.
+    """
+
+    def db_for_read(self, model, **hints):
+        reads = _replica_reads.get()
+        if reads is None or model._meta.app_label not in REPLICA_APPS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        if reads.alias is None:
+            reads.alias = pool.choose() or DEFAULT_DB_ALIAS
+        return reads.alias
+
+    def db_for_write(self, model, **hints):
+        # Objects read from a replica are still saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *pool.aliases}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+def current_read_database(model):
+    """The alias the current request reads `model` from (binds the replica choice, e.g. before streaming)."""
+    return ReplicaRouter().db_for_read(model)
+
+
+# --- Middleware ---
+def pin_seconds():
+    return float(getattr(settings, 'REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS))
+
+
+def is_pinned(request):
+    try:
+        return float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Lets safe requests to views that set read_from_replica = True read from a
+    replica, unless the client wrote something within the last
+    REPLICA_PIN_SECONDS (tracked with a cookie), so users always see their own
+    writes. Disabled when no DATABASE_REPLICAS are configured.
+    """
+
+    def __init__(self, get_response):
+        if not pool.aliases:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _replica_reads.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = pin_seconds()
+            response.set_cookie(
+                PIN_COOKIE, f'{time.time() + seconds:.3f}', max_age=max(1, round(seconds)),
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # DRF's as_view() exposes the view class as view_func.cls.
+        view_class = getattr(view_func, 'cls', None)
+        if request.method in SAFE_METHODS and getattr(view_class, 'read_from_replica', False) and not is_pinned(request):
+            _replica_reads.set(ReplicaReads())
@@ -0,0 +1,99 @@
+import time
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DashboardMetric, MetricRetention, RollupWatermark, StationMetricRollup
+from .rollups import ROLLUP_GRANULARITIES, WATERMARK_NAME, retention_cutoff, update_rollups
+
+# Rows deleted per transaction; small enough that no batch holds locks for long.
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def compacted_cutoff(tier='raw', using='default'):
+    """Time before which compaction has deleted `tier`, or None if it never has."""
+    return (
+        MetricRetention.objects.using(using)
+        .filter(tier=tier).values_list('cutoff', flat=True).first()
+    )
+
+
+def _record_cutoff(tier, cutoff, using):
+    previous = compacted_cutoff(tier, using)
+    if previous is None or cutoff > previous:
+        MetricRetention.objects.using(using).update_or_create(tier=tier, defaults={'cutoff': cutoff})
+
+
+def delete_in_batches(queryset, batch_size=DEFAULT_BATCH_SIZE, pause=0.0, progress=None, restrict=None):
+    """
+    Deletes the queryset's rows in id order, batch_size per transaction, and
+    returns how many were deleted. Stopping part way leaves every finished
+    batch deleted, so running it again simply carries on. restrict(queryset),
+    if given, narrows the queryset inside each batch's transaction.
+    """
+    deleted = 0
+    while True:
+        with transaction.atomic(using=queryset.db):
+            batch = restrict(queryset) if restrict else queryset
+            ids = list(batch.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            # Keep the original filter so PostgreSQL can prune partitions.
+            count, _ = batch.filter(id__in=ids).delete()
+        deleted += count
+        if progress:
+            progress(deleted)
+        if pause:
+            time.sleep(pause)
+
+
+def _covered_by_rollups(queryset):
+    # The watermark only passes settled ids (rollups.settled_max_id), so every id at or below it
+    # was folded. Locking it for the batch keeps a concurrent reset_rollups() from dropping those
+    # rollups before the batch commits.
+    watermark = (
+        RollupWatermark.objects.using(queryset.db).select_for_update()
+        .filter(name=WATERMARK_NAME).values_list('last_id', flat=True).first()
+    )
+    return queryset.filter(id__lte=watermark or 0)
+
+
+def expire_raw_metrics(cutoff, batch_size=DEFAULT_BATCH_SIZE, pause=0.0, using='default', progress=None):
+    """
+    Folds every raw metric into the rollups, then deletes raw rows older than
+    `cutoff`. Each batch only deletes rows at or below the rollup watermark as
+    it stands in that batch's transaction, so nothing goes before the rollups
+    cover it.
+    """
+    update_rollups(using=using)
+    expired = DashboardMetric.objects.using(using).filter(timestamp__lt=cutoff)
+    deleted = delete_in_batches(expired, batch_size, pause, progress, restrict=_covered_by_rollups)
+    _record_cutoff('raw', cutoff, using)
+    return deleted
+
+
+def compact_metrics(now=None, batch_size=DEFAULT_BATCH_SIZE, pause=0.0, using='default', progress=None):
+    """
+    Applies the retention policy (rollups.retention_policy): raw metrics past
+    their cutoff are compacted into the rollups and deleted, then rollups past
+    their granularity's cutoff are deleted. Returns {tier: rows deleted} for
+    every tier that has a cutoff. progress(tier, deleted) is called per batch.
+    """
+    now = now or timezone.now()
+    deleted = {}
+
+    def report(tier):
+        return (lambda count: progress(tier, count)) if progress else None
+
+    cutoff = retention_cutoff('raw', now)
+    if cutoff is not None:
+        deleted['raw'] = expire_raw_metrics(cutoff, batch_size, pause, using, report('raw'))
+
+    for granularity in ROLLUP_GRANULARITIES:
+        cutoff = retention_cutoff(granularity, now)
+        if cutoff is None:
+            continue
+        expired = StationMetricRollup.objects.using(using).filter(granularity=granularity, bucket__lt=cutoff)
+        deleted[granularity] = delete_in_batches(expired, batch_size, pause, report(granularity))
+        _record_cutoff(granularity, cutoff, using)
+    return deleted
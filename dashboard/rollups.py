@@ -0,0 +1,454 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .aggregation import (
+    BUCKETS, GROUP_BY_FIELDS, METRIC_FIELDS, SUMMARY_PERCENTILES,
+    bucket_expression, ceil_to_bucket, floor_to_bucket, validate_group_by,
+)
+from .models import DashboardMetric, MetricRetention, RollupWatermark, StationMetricRollup
+
+# Rollup granularities, finest first. Each must be a key of aggregation.BUCKETS.
+ROLLUP_GRANULARITIES = ('5m', '1h', '1d')
+
+# Days each tier is kept before compaction (manage.py compact_metrics) deletes
+# it; None keeps it forever. 'raw' is DashboardMetric itself, the others are
+# rollup granularities. Override per tier with settings.METRIC_RETENTION_DAYS.
+DEFAULT_RETENTION_DAYS = {'raw': 30, '5m': 365, '1h': None, '1d': None}
+RETENTION_TIERS = ('raw', *ROLLUP_GRANULARITIES)
+# Cutoffs fall on day boundaries, so expiring a tier never splits a coarser bucket.
+RETENTION_ALIGNMENT = BUCKETS['1d']
+
+WATERMARK_NAME = 'station_metric_rollups'
+
+# Raw metric IDs folded into the rollups per transaction.
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Seconds update_rollups() waits for metric writers that were open when it read
+# the newest id; if they are still running it folds nothing new this run.
+DEFAULT_WRITER_TIMEOUT = 30
+
+STAT_FIELDS = tuple(f'{field}_{stat}' for field in METRIC_FIELDS for stat in ('sum', 'min', 'max'))
+
+
+# --- Statistics helpers ---
+def raw_stat_aggregates():
+    """count/sum/min/max over raw DashboardMetric rows."""
+    aggregates = {'count': Count('id')}
+    for field in METRIC_FIELDS:
+        aggregates[f'{field}_sum'] = Sum(field)
+        aggregates[f'{field}_min'] = Min(field)
+        aggregates[f'{field}_max'] = Max(field)
+    return aggregates
+
+
+def rollup_stat_aggregates():
+    """The same statistics, re-aggregated from StationMetricRollup rows."""
+    aggregates = {'count': Sum('count')}
+    for field in METRIC_FIELDS:
+        aggregates[f'{field}_sum'] = Sum(f'{field}_sum')
+        aggregates[f'{field}_min'] = Min(f'{field}_min')
+        aggregates[f'{field}_max'] = Max(f'{field}_max')
+    return aggregates
+
+
+def merge_stats(target, other):
+    """Folds `other` into `target` (or returns a copy of `other` if target is None)."""
+    if target is None:
+        return dict(other)
+    target['count'] += other['count']
+    for field in METRIC_FIELDS:
+        target[f'{field}_sum'] += other[f'{field}_sum']
+        target[f'{field}_min'] = min(target[f'{field}_min'], other[f'{field}_min'])
+        target[f'{field}_max'] = max(target[f'{field}_max'], other[f'{field}_max'])
+    return target
+
+
+def _accumulate(result, queryset, aggregates, group_fields=(), bucket_size=None, bucket_expr=None):
+    """
+    Aggregates `queryset` in the database, grouped by group_fields (and by bucket
+    when bucket_size is given), and merges the rows into
+    result[(group_values, bucket_start)].
+    """
+    queryset = queryset.order_by()
+    fields = list(group_fields)
+    if bucket_size:
+        queryset = queryset.annotate(bucket_start=bucket_expr)
+        fields.append('bucket_start')
+
+    if fields:
+        rows = queryset.values(*fields).annotate(**aggregates)
+    else:
+        row = queryset.aggregate(**aggregates)
+        rows = [row] if row['count'] else []
+
+    for row in rows:
+        group = tuple(row[field] for field in group_fields)
+        bucket = floor_to_bucket(row['bucket_start'], bucket_size) if bucket_size else None
+        stats = {'count': row['count'], **{name: row[name] for name in STAT_FIELDS}}
+        result[(group, bucket)] = merge_stats(result.get((group, bucket)), stats)
+    return result
+
+
+# --- Incremental maintenance ---
+def current_watermark(using='default'):
+    """Highest metric id covered by the rollups, or None if they were never built."""
+    return (
+        RollupWatermark.objects.using(using)
+        .filter(name=WATERMARK_NAME).values_list('last_id', flat=True).first()
+    )
+
+
+def _upsert_rollups(granularity, deltas, using):
+    if not deltas:
+        return
+    station_ids = {group[0] for group, _ in deltas}
+    buckets = [bucket for _, bucket in deltas]
+    existing = StationMetricRollup.objects.using(using).filter(
+        granularity=granularity, station_id__in=station_ids,
+        bucket__gte=min(buckets), bucket__lte=max(buckets),
+    )
+    merged = dict(deltas)
+    for rollup in existing:
+        key = ((rollup.station_id,), rollup.bucket)
+        if key in merged:
+            current = {'count': rollup.count, **{name: getattr(rollup, name) for name in STAT_FIELDS}}
+            merged[key] = merge_stats(current, merged[key])
+
+    StationMetricRollup.objects.using(using).bulk_create(
+        [
+            StationMetricRollup(station_id=group[0], granularity=granularity, bucket=bucket, **stats)
+            for (group, bucket), stats in merged.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['granularity', 'station', 'bucket'],
+        update_fields=['count', *STAT_FIELDS],
+    )
+
+
+def _newest_metric_id(using):
+    return DashboardMetric.objects.using(using).aggregate(max_id=Max('id'))['max_id'] or 0
+
+
+def open_metric_writers(using='default'):
+    """
+    Virtual transaction ids of the other transactions currently able to insert
+    metrics (holding ROW EXCLUSIVE on the table). Always empty off PostgreSQL.
+    """
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return set()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT DISTINCT virtualtransaction FROM pg_locks"
+            " WHERE locktype = 'relation' AND relation = %s::regclass AND mode = 'RowExclusiveLock'"
+            " AND granted AND pid <> pg_backend_pid()",
+            [DashboardMetric._meta.db_table],
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+
+def settled_max_id(using='default', timeout=DEFAULT_WRITER_TIMEOUT):
+    """
+    Highest metric id with no uncommitted id below it, or None if that can't be
+    established within `timeout` seconds.
+
+    Ids are drawn when a row is inserted, not when it commits, and /ingest/ and
+    load_data keep a whole batch in one transaction, so on PostgreSQL a lower
+    id can become visible after a higher one. Every writer holds a ROW
+    EXCLUSIVE lock on the metric table from before it draws an id until it
+    commits, so the newest id is only returned once every writer holding that
+    lock when it was read has finished. Other backends serialise writers, so
+    their newest visible id is already settled.
+    """
+    max_id = _newest_metric_id(using)
+    deadline = time.monotonic() + timeout
+    delay = 0.05
+    writers = open_metric_writers(using)
+    while writers:
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+        writers &= open_metric_writers(using)
+    return max_id
+
+
+class SettledIdTracker:
+    """
+    settled_max_id() for pollers that must not wait: each poll() returns the
+    highest metric id known to be settled so far (None until one is). A
+    candidate id is remembered with the writers open when it was read and
+    becomes settled at the first later poll that finds all of them finished.
+    """
+
+    def __init__(self, using='default'):
+        self.using = using
+        self.settled = None
+        self._pending = None
+
+    def poll(self):
+        max_id = _newest_metric_id(self.using)
+        writers = open_metric_writers(self.using)
+        if self._pending and self._pending[1].isdisjoint(writers):
+            self.settled, self._pending = self._pending[0], None
+        if self._pending is None:
+            if writers:
+                self._pending = (max_id, writers)
+            else:
+                self.settled = max_id
+        return self.settled
+
+
+def update_rollups(chunk_size=DEFAULT_CHUNK_SIZE, using='default', progress=None, writer_timeout=DEFAULT_WRITER_TIMEOUT):
+    """
+    Folds metrics with an id above the watermark into every rollup granularity,
+    chunk_size ids per transaction, and returns the number of raw rows processed.
+    The watermark only moves past ids that are settled (see settled_max_id), so
+    a row committed late by a long ingest transaction is never skipped. Each
+    chunk locks the watermark, so concurrent runs take turns instead of
+    folding the same ids twice.
+    Metrics are treated as append-only: edits or deletions of rows already
+    folded in are not reflected until a backfill.
+    """
+    RollupWatermark.objects.using(using).get_or_create(name=WATERMARK_NAME)
+    max_id = settled_max_id(using, writer_timeout)
+    if max_id is None:
+        return 0
+    vendor = connections[using].vendor
+    processed = 0
+
+    while True:
+        with transaction.atomic(using=using):
+            # Re-read and lock the watermark per chunk, so overlapping runs (a worker and
+            # compact_metrics, or two cron jobs) never fold the same ids twice.
+            watermark = RollupWatermark.objects.using(using).select_for_update().get(name=WATERMARK_NAME)
+            if watermark.last_id >= max_id:
+                break
+            upper = min(watermark.last_id + chunk_size, max_id)
+            raw = DashboardMetric.objects.using(using).filter(id__gt=watermark.last_id, id__lte=upper)
+            rows = raw.count()
+            for granularity in ROLLUP_GRANULARITIES:
+                size = BUCKETS[granularity]
+                deltas = _accumulate(
+                    {}, raw, raw_stat_aggregates(), ('station_id',), size, bucket_expression(vendor, size)[0],
+                )
+                _upsert_rollups(granularity, deltas, using)
+            watermark.last_id = upper
+            watermark.save(using=using, update_fields=['last_id'])
+        processed += rows
+        if progress:
+            progress(processed, upper)
+    return processed
+
+
+def reset_rollups(using='default', since=None):
+    """
+    Deletes the rollups and rewinds the watermark, ready for a backfill. With
+    `since`, only buckets from then on are deleted; older ones are kept, e.g.
+    because compaction removed the raw rows they were built from. A full reset
+    also forgets compaction, as it is meant for a fresh metric history.
+    """
+    with transaction.atomic(using=using):
+        # Rewound (and locked) first, so compaction can't delete raw rows whose rollups are going.
+        RollupWatermark.objects.using(using).update_or_create(name=WATERMARK_NAME, defaults={'last_id': 0})
+        rollups = StationMetricRollup.objects.using(using).all()
+        if since is not None:
+            rollups = rollups.filter(bucket__gte=since)
+        else:
+            MetricRetention.objects.using(using).all().delete()
+        rollups.delete()
+
+
+# --- Retention policy ---
+def retention_policy():
+    """{tier: days or None}. Coarser tiers must be kept at least as long as finer ones."""
+    policy = {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'METRIC_RETENTION_DAYS', {})}
+    unknown = set(policy) - set(RETENTION_TIERS)
+    if unknown:
+        raise ImproperlyConfigured(f'Unknown METRIC_RETENTION_DAYS tiers: {", ".join(sorted(unknown))}.')
+    previous = 0
+    for tier in RETENTION_TIERS:
+        days = policy[tier]
+        if previous is None and days is not None or days is not None and days < previous:
+            raise ImproperlyConfigured(
+                f'METRIC_RETENTION_DAYS[{tier!r}] must not be shorter than the retention of finer tiers.'
+            )
+        previous = days
+    return policy
+
+
+def retention_cutoff(tier, now=None):
+    """Start of the data the policy keeps for `tier`, or None if it is kept forever."""
+    days = retention_policy()[tier]
+    if days is None:
+        return None
+    return floor_to_bucket((now or timezone.now()) - timedelta(days=days), RETENTION_ALIGNMENT)
+
+
+def finest_tier(moment, now=None):
+    """The finest tier ('raw' or a granularity) the policy still keeps at `moment`."""
+    for tier in RETENTION_TIERS:
+        cutoff = retention_cutoff(tier, now)
+        if cutoff is None or moment >= cutoff:
+            return tier
+    return RETENTION_TIERS[-1]
+
+
+def retained_bucket(bucket, moment):
+    """`bucket`, coarsened when data at `moment` is only kept at a coarser granularity."""
+    tier = finest_tier(moment)
+    if tier != 'raw' and BUCKETS[bucket] < BUCKETS[tier]:
+        return tier
+    return bucket
+
+
+def _widen_to_retained(value, rounding):
+    """Rounds a window bound older than the raw cutoff to the buckets kept at that time."""
+    if value is None:
+        return None
+    tier = finest_tier(value)
+    return value if tier == 'raw' else rounding(value, BUCKETS[tier])
+
+
+def history_bounds(raw_queryset, rollup_queryset):
+    """(first, last) metric time across raw rows and the (possibly older) compacted rollups."""
+    raw = raw_queryset.order_by().aggregate(first=Min('timestamp'), last=Max('timestamp'))
+    rollups = (
+        rollup_queryset.filter(granularity=ROLLUP_GRANULARITIES[-1]).order_by()
+        .aggregate(first=Min('bucket'), last=Max('bucket'))
+    )
+    first = min((value for value in (raw['first'], rollups['first']) if value), default=None)
+    last = max((value for value in (raw['last'], rollups['last']) if value), default=None)
+    return first, last
+
+
+# --- Tiered reads ---
+def plan_segments(start, end, granularities):
+    """
+    Splits the window [start, end) (either bound may be None) into segments
+    served by rollups, coarsest granularity first, and the uneven edges left
+    over for raw rows. Returns ([(granularity, seg_start, seg_end)], [(seg_start, seg_end)]).
+    """
+    if not granularities:
+        return [], [(start, end)]
+    granularity, finer = granularities[0], granularities[1:]
+    size = BUCKETS[granularity]
+    inner_start = ceil_to_bucket(start, size) if start else None
+    inner_end = floor_to_bucket(end, size) if end else None
+    if inner_start and inner_end and inner_start >= inner_end:
+        return plan_segments(start, end, finer)
+
+    rollup_segments, raw_segments = [(granularity, inner_start, inner_end)], []
+    for edge_start, edge_end in ((start, inner_start), (inner_end, end)):
+        if edge_start is not None and edge_end is not None and edge_start < edge_end:
+            rollups, raws = plan_segments(edge_start, edge_end, finer)
+            rollup_segments += rollups
+            raw_segments += raws
+    return rollup_segments, raw_segments
+
+
+def _range_q(field, start, end):
+    q = Q()
+    if start is not None:
+        q &= Q(**{f'{field}__gte': start})
+    if end is not None:
+        q &= Q(**{f'{field}__lt': end})
+    return q
+
+
+def collect_stats(raw_queryset, rollup_queryset, start, end, group_fields=(), bucket=None):
+    """
+    Computes {(group_values, bucket_start): stats} for the window, reading the
+    coarsest rollups that fit and raw rows only for the edges and for metrics
+    newer than the watermark. raw_queryset must already be limited to the window.
+    Returns None when no usable rollup exists; callers then aggregate raw rows.
+    """
+    watermark = current_watermark(raw_queryset.db)
+    if not watermark:
+        return None
+    size = BUCKETS[bucket] if bucket else None
+    granularities = [
+        granularity for granularity in reversed(ROLLUP_GRANULARITIES)
+        if size is None or size % BUCKETS[granularity] == timedelta(0)
+    ]
+    if not granularities:
+        return None
+
+    # Raw rows older than the retention cutoff are gone, so old bounds are widened to whole kept buckets.
+    start, end = _widen_to_retained(start, floor_to_bucket), _widen_to_retained(end, ceil_to_bucket)
+    rollup_segments, raw_segments = plan_segments(start, end, granularities)
+    result = {}
+    for granularity, segment_start, segment_end in rollup_segments:
+        rollups = rollup_queryset.filter(granularity=granularity).filter(_range_q('bucket', segment_start, segment_end))
+        _accumulate(result, rollups, rollup_stat_aggregates(), group_fields, size, F('bucket'))
+
+    raw_filter = Q(id__gt=watermark)
+    for segment_start, segment_end in raw_segments:
+        raw_filter |= _range_q('timestamp', segment_start, segment_end)
+    expression = bucket_expression(connections[raw_queryset.db].vendor, size)[0] if size else None
+    _accumulate(result, raw_queryset.filter(raw_filter), raw_stat_aggregates(), group_fields, size, expression)
+    return result
+
+
+def _shape_stats(stats, percentiles=False):
+    shaped = {'count': stats['count']}
+    for field in METRIC_FIELDS:
+        shaped[field] = {
+            'avg': stats[f'{field}_sum'] / stats['count'],
+            'min': stats[f'{field}_min'],
+            'max': stats[f'{field}_max'],
+        }
+        if percentiles:
+            for percentile in SUMMARY_PERCENTILES:
+                shaped[field][f'p{round(percentile * 100)}'] = None
+    return shaped
+
+
+def _empty_summary():
+    shaped = {'count': 0}
+    for field in METRIC_FIELDS:
+        shaped[field] = {'avg': None, 'min': None, 'max': None}
+        for percentile in SUMMARY_PERCENTILES:
+            shaped[field][f'p{round(percentile * 100)}'] = None
+    return shaped
+
+
+def summarize_from_rollups(raw_queryset, rollup_queryset, start, end, group_by=None):
+    """Rollup-backed equivalent of aggregation.summarize_metrics (percentiles are not available)."""
+    validate_group_by(group_by)
+    group_fields = GROUP_BY_FIELDS[group_by] if group_by else ()
+    stats = collect_stats(raw_queryset, rollup_queryset, start, end, group_fields)
+    if stats is None:
+        return None
+
+    overall = None
+    for group_stats in stats.values():
+        overall = merge_stats(overall, group_stats)
+    result = {'overall': _shape_stats(overall, percentiles=True) if overall else _empty_summary()}
+    if group_by:
+        groups = []
+        for (group, _), group_stats in sorted(stats.items(), key=lambda item: item[0][0][0]):
+            entry = {'id': group[0], 'name': group[1]}
+            entry.update(_shape_stats(group_stats, percentiles=True))
+            groups.append(entry)
+        result['groups'] = groups
+    return result
+
+
+def bucket_from_rollups(raw_queryset, rollup_queryset, start, end, bucket):
+    """Rollup-backed equivalent of aggregation.bucket_metrics."""
+    stats = collect_stats(raw_queryset, rollup_queryset, start, end, ('station_id',), bucket)
+    if stats is None:
+        return None
+    series = {}
+    for (group, bucket_start), point_stats in sorted(stats.items(), key=lambda item: (item[0][0], item[0][1])):
+        point = {'timestamp': bucket_start}
+        point.update(_shape_stats(point_stats))
+        series.setdefault(group[0], []).append(point)
+    return series
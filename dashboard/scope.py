@@ -0,0 +1,132 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from .models import Station, UserProfile
+
+SCOPE_CACHE_TTL = 300
+SCOPE_CACHE_PREFIX = 'dashboard:scope'
+# Part of every cache key; bump it when StationScope's fields change.
+SCOPE_CACHE_VERSION = 2
+# Bumped whenever stations change, which invalidates every cached scope at once.
+SCOPE_GENERATION_KEY = f'{SCOPE_CACHE_PREFIX}:generation'
+
+# Attribute used to memoize the scope on the user object for the rest of the request.
+REQUEST_SCOPE_ATTR = '_dashboard_scope'
+
+
+class StationScope:
+    """
+    The stations, regions and countries a user may see.
+    Staff users have a global scope and are never filtered by ID.
+    whole_countries is set when the scope is every station of its countries,
+    so metrics can be filtered by their country instead of a station list.
+    """
+    __slots__ = ('is_global', 'station_ids', 'region_ids', 'country_ids', 'whole_countries')
+
+    def __init__(self, is_global=False, station_ids=(), region_ids=(), country_ids=(), whole_countries=False):
+        self.is_global = is_global
+        self.station_ids = frozenset(station_ids)
+        self.region_ids = frozenset(region_ids)
+        self.country_ids = frozenset(country_ids)
+        self.whole_countries = whole_countries
+
+    @property
+    def cache_key(self):
+        """Identifies the scope itself, so users with identical scopes can share cache entries."""
+        if self.is_global:
+            return 'global'
+        return hashlib.sha1(','.join(sorted(self.station_ids)).encode()).hexdigest()
+
+    def allows_station(self, station_id):
+        return self.is_global or station_id in self.station_ids
+
+
+EMPTY_SCOPE = StationScope()
+GLOBAL_SCOPE = StationScope(is_global=True)
+
+
+def _new_generation():
+    # Time-based, so a generation lost from the cache is never reused.
+    generation = time.time_ns()
+    cache.set(SCOPE_GENERATION_KEY, generation, None)
+    return generation
+
+
+def _scope_generation():
+    generation = cache.get(SCOPE_GENERATION_KEY)
+    return generation if generation is not None else _new_generation()
+
+
+def _user_cache_key(user_id):
+    return f'{SCOPE_CACHE_PREFIX}:v{SCOPE_CACHE_VERSION}:{_scope_generation()}:user:{user_id}'
+
+
+def _compute_scope(django_user):
+    if django_user.is_staff:
+        return GLOBAL_SCOPE
+
+    # Read from the primary: the result is cached for every request, and a
+    # lagging replica would cache a scope from before the latest change.
+    profiles = UserProfile.objects.using(DEFAULT_DB_ALIAS)
+    stations = Station.objects.using(DEFAULT_DB_ALIAS)
+    profile = (
+        profiles.filter(user_id=django_user.pk)
+        .values('role', 'country_id', 'station_id').first()
+    )
+    if profile is None:
+        return EMPTY_SCOPE
+
+    role, country_id, station_id = profile['role'], profile['country_id'], profile['station_id']
+    whole_countries = False
+    if role == 'Country Lead' and country_id:
+        stations = stations.filter(country_id=country_id)
+        whole_countries = True
+    elif role == 'Station Manager' and station_id:
+        stations = stations.filter(id=station_id)
+    elif role == 'Viewer' and station_id:
+        stations = stations.filter(id=station_id)
+    elif role == 'Viewer' and country_id:
+        stations = stations.filter(country_id=country_id)
+        whole_countries = True
+    else:
+        return EMPTY_SCOPE
+
+    rows = list(stations.values_list('id', 'region_id', 'country_id'))
+    return StationScope(
+        station_ids=(row[0] for row in rows),
+        region_ids=(row[1] for row in rows),
+        country_ids=(row[2] for row in rows),
+        whole_countries=whole_countries,
+    )
+
+
+def get_user_scope(django_user):
+    """
+    Resolves the user's StationScope once per request (memoized on the user
+    object) and once per SCOPE_CACHE_TTL across requests (shared cache).
+    """
+    if not django_user.is_authenticated:
+        return EMPTY_SCOPE
+    scope = getattr(django_user, REQUEST_SCOPE_ATTR, None)
+    if scope is not None:
+        return scope
+
+    key = _user_cache_key(django_user.pk)
+    scope = cache.get(key)
+    if scope is None:
+        scope = _compute_scope(django_user)
+        cache.set(key, scope, SCOPE_CACHE_TTL)
+    setattr(django_user, REQUEST_SCOPE_ATTR, scope)
+    return scope
+
+
+# --- Invalidation (connected in signals.py) ---
+def invalidate_user_scope(user_id):
+    cache.delete(_user_cache_key(user_id))
+
+
+def invalidate_all_scopes():
+    _new_generation()
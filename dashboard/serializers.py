@@ -1,7 +1,9 @@
 from rest_framework import serializers
 from django.db import transaction
 from django.contrib.auth.models import User as AuthUser
-from .models import Country, Region, Station, UserProfile, DashboardMetric, AuditLog
+from .models import (
+    Country, Region, Station, UserProfile, DashboardMetric, AuditLog, StationAlert, StationLatestMetric,
+)
 
 class CountrySerializer(serializers.ModelSerializer):
     class Meta:
@@ -133,7 +135,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
 class DashboardMetricSerializer(serializers.ModelSerializer):
     class Meta:
         model = DashboardMetric
-        fields = '__all__'
+        # region/country are derived from the station on save.
+        exclude = ['region', 'country']
 
 class AuditLogSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
@@ -142,3 +145,81 @@ class AuditLogSerializer(serializers.ModelSerializer):
         model = AuditLog
         fields = ['id', 'timestamp', 'user', 'user_email', 'action', 'target', 'details']
         read_only_fields = ['user_email']
+
+class StationAlertSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StationAlert
+        fields = '__all__'
+
+class StationLatestMetricSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StationLatestMetric
+        fields = '__all__'
+
+
+# --- Fast read-only list serialization ---
+class ValuesRowSerializer:
+    """
+    Produces the same dicts as a ModelSerializer's list output, but from
+    .values_list() tuples instead of model instances, skipping DRF's per-field
+    machinery. The columns and key order are taken from the ModelSerializer, so
+    the two stay in step. Only plain columns, primary-key relations and
+    datetimes (ISO 8601, as DRF renders them) are supported.
+    """
+    passthrough_fields = (
+        serializers.IntegerField, serializers.FloatField, serializers.CharField,
+        serializers.BooleanField, serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer_class):
+        self.serializer_class = serializer_class
+        self._layout = None
+
+    @property
+    def layout(self):
+        # Built on first use, once the app registry is ready.
+        if self._layout is None:
+            keys, columns, datetime_fields = [], [], []
+            for name, field in self.serializer_class().fields.items():
+                if field.write_only:
+                    continue
+                if isinstance(field, serializers.DateTimeField):
+                    datetime_fields.append((name, field))
+                elif not isinstance(field, self.passthrough_fields):
+                    raise TypeError(f'{type(field).__name__} {name!r} is not supported by {type(self).__name__}.')
+                keys.append(name)
+                columns.append(field.source.replace('.', '__'))
+            self._layout = (tuple(keys), tuple(columns), tuple(datetime_fields))
+        return self._layout
+
+    @staticmethod
+    def datetime_converter(field):
+        # Mirrors DateTimeField.to_representation with the default ISO 8601 format.
+        field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+        to_utc = field_timezone is not None and str(field_timezone) == 'UTC'
+
+        def convert(value):
+            offset = value.utcoffset()
+            if to_utc and not offset and offset is not None:
+                # Already UTC (the database's usual answer): no conversion needed.
+                return value.replace(tzinfo=None).isoformat() + 'Z'
+            if field_timezone is not None and offset is not None:
+                value = value.astimezone(field_timezone)
+            value = value.isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        return convert
+
+    def values(self, queryset, named=False):
+        return queryset.values_list(*self.layout[1], named=named)
+
+    def serialize(self, rows):
+        keys, _, datetime_fields = self.layout
+        results = [dict(zip(keys, row)) for row in rows]
+        for key, field in datetime_fields:
+            convert = self.datetime_converter(field)
+            for item in results:
+                if item[key] is not None:
+                    item[key] = convert(item[key])
+        return results
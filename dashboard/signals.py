@@ -0,0 +1,69 @@
+from django.contrib.auth.models import User as AuthUser
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .caching import invalidate_hierarchy_cache
+from .ingest import invalidate_known_stations
+from .loaders import (
+    METRIC_COLUMNS, SCOPE_COLUMNS, refresh_latest_metrics, sync_metric_scope_columns, upsert_latest_metrics,
+)
+from .models import Country, DashboardMetric, Region, Station, UserProfile
+from .scope import invalidate_all_scopes, invalidate_user_scope
+
+
+@receiver([post_save, post_delete], sender=Station)
+def station_changed(sender, **kwargs):
+    invalidate_known_stations()
+    invalidate_all_scopes()
+    invalidate_hierarchy_cache()
+
+
+@receiver(pre_save, sender=Station)
+def station_saving(sender, instance, using, **kwargs):
+    # Remembered so station_saved only touches the metrics when the station actually moved.
+    instance._stored_scope = (
+        Station.objects.using(using).filter(pk=instance.pk).values_list(*SCOPE_COLUMNS).first()
+    )
+
+
+@receiver(post_save, sender=Station)
+def station_saved(sender, instance, using, **kwargs):
+    # Keeps the metrics' denormalized region/country in step when a station moves.
+    stored = getattr(instance, '_stored_scope', None)
+    if stored is not None and stored != (instance.region_id, instance.country_id):
+        sync_metric_scope_columns([instance.pk], using=using)
+
+
+@receiver([post_save, post_delete], sender=Country)
+@receiver([post_save, post_delete], sender=Region)
+def hierarchy_changed(sender, **kwargs):
+    invalidate_hierarchy_cache()
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    invalidate_user_scope(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=AuthUser)
+def auth_user_changed(sender, instance, **kwargs):
+    # is_staff grants the global scope, so role changes on the auth user matter too.
+    invalidate_user_scope(instance.pk)
+
+
+@receiver(pre_save, sender=DashboardMetric)
+def metric_saving(sender, instance, using, **kwargs):
+    # Bulk loads read these from Station in the INSERT itself (loaders.bulk_insert_metric_rows).
+    instance.region_id, instance.country_id = (
+        Station.objects.using(using).filter(pk=instance.station_id).values_list(*SCOPE_COLUMNS).first() or (None, None)
+    )
+
+
+@receiver(post_save, sender=DashboardMetric)
+def metric_saved(sender, instance, created, using, **kwargs):
+    # Bulk loads upsert the snapshot themselves (loaders.load_metric_rows).
+    if created:
+        upsert_latest_metrics([tuple(getattr(instance, column) for column in METRIC_COLUMNS)], using=using)
+    else:
+        # An edit may have moved the station's newest reading back in time.
+        refresh_latest_metrics([instance.station_id], using=using)
@@ -7,7 +7,12 @@ from .views import (
     StationViewSet,
     DashboardMetricViewSet,
     AuditLogViewSet,
-    current_user_profile_view  # Import the new view
+    StationAlertViewSet,
+    current_user_profile_view,  # Import the new view
+    metric_stream_view,
+    dashboard_bootstrap_view,
+    perf_stats_view,
+    database_stats_view,
 )
 
 # Create a router and register our viewsets with it.
@@ -18,12 +23,25 @@ router.register(r'regions', RegionViewSet, basename='region')
 router.register(r'stations', StationViewSet, basename='station')
 router.register(r'metrics', DashboardMetricViewSet, basename='dashboardmetric')
 router.register(r'auditlog', AuditLogViewSet, basename='auditlog')
+router.register(r'alerts', StationAlertViewSet, basename='stationalert')
 
 # The API URLs are now determined automatically by the router.
 # We add the custom URL for the current user profile manually.
 urlpatterns = [
     # This line creates the /api/users/me/ endpoint
     path('users/me/', current_user_profile_view, name='current-user-profile'),
+
+    # Everything the dashboard needs for its first render in one request
+    path('dashboard/bootstrap/', dashboard_bootstrap_view, name='dashboard-bootstrap'),
+
+    # Per-endpoint query/latency statistics (staff only, needs PERF_INSTRUMENTATION)
+    path('_perf/', perf_stats_view, name='perf-stats'),
+
+    # Database connection/pool statistics for this process (staff only)
+    path('_db/', database_stats_view, name='database-stats'),
+
+    # Server-Sent Events stream of new metrics (served under ASGI)
+    path('metrics/stream/', metric_stream_view, name='metric-stream'),
     
     # This includes all the URLs from the router (e.g., /api/users/, /api/stations/, etc.)
     path('', include(router.urls)),
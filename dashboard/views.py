@@ -1,19 +1,47 @@
+import codecs
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django.db import transaction
-from .models import Country, Region, Station, DashboardMetric, AuditLog, UserProfile
+from django.db.models import Q
+from .models import (
+    Country, Region, Station, DashboardMetric, AuditLog, UserProfile, StationMetricRollup, StationAlert,
+    StationLatestMetric,
+)
 from django.contrib.auth.models import User as AuthUser
 from .serializers import (
     CountrySerializer, RegionSerializer, StationSerializer,
-    UserProfileSerializer, DashboardMetricSerializer, AuditLogSerializer
+    UserProfileSerializer, DashboardMetricSerializer, AuditLogSerializer, StationAlertSerializer,
+    StationLatestMetricSerializer, ValuesRowSerializer,
 )
 from .permissions import IsAdminOrReadOnly
+from .scope import get_user_scope
+from .caching import CachedHierarchyListMixin
+from .audit import AuditedViewSetMixin
+from . import perf, pooling
+from .replicas import current_read_database
+from .rollups import bucket_from_rollups, history_bounds, retained_bucket, summarize_from_rollups
+from .live import stream_metric_events
+from .pagination import TimestampCursorPagination
+from .renderers import ColumnarRenderer, CSVRenderer, NDJSONRenderer
+from .columnar import COLUMNAR_ENCODINGS, columnar_rows, columnar_series
+from .exports import iter_export_rows, stream_csv, stream_ndjson
+from .ingest import ingest_metric_records
+from .loaders import iter_json_array, iter_ndjson, refresh_latest_metrics
+from .aggregation import (
+    BUCKETS, MAX_BUCKET_OVERSAMPLING, MAX_SERIES_POINTS, bucket_metrics, choose_bucket, downsample_points,
+    filter_time_window, parse_int_param, summarize_metrics,
+)
 
 # Imports for the custom user profile view
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 
 
 # --- Root View ---
@@ -29,87 +57,297 @@ def root_view(request):
 
 # --- Helper function to get the user's allowed stations ---
 def get_allowed_stations_for_user(django_user):
-    if not django_user.is_authenticated:
-        return Station.objects.none()
+    return scoped_stations(get_user_scope(django_user))
+
+# --- Scoped querysets shared by the viewsets and the bootstrap view ---
+def scoped_profiles(django_user):
     if django_user.is_staff:
+        return UserProfile.objects.all().select_related('user')
+    if django_user.is_authenticated:
+        return UserProfile.objects.filter(user=django_user).select_related('user')
+    return UserProfile.objects.none()
+
+def scoped_countries(scope):
+    if scope.is_global:
+        return Country.objects.filter(id__in=Station.objects.values('country_id'))
+    return Country.objects.filter(id__in=scope.country_ids)
+
+def scoped_regions(scope):
+    if scope.is_global:
+        return Region.objects.filter(id__in=Station.objects.values('region_id'))
+    return Region.objects.filter(id__in=scope.region_ids)
+
+def scoped_stations(scope):
+    if scope.is_global:
         return Station.objects.all()
-    
-    try:
-        profile = django_user.profile
-    except UserProfile.DoesNotExist:
-        return Station.objects.none()
-
-    if profile.role == 'Country Lead' and profile.country:
-        return Station.objects.filter(country=profile.country)
-    if profile.role == 'Station Manager' and profile.station:
-        return Station.objects.filter(id=profile.station.id)
-    if profile.role == 'Viewer':
-        if profile.station:
-            return Station.objects.filter(id=profile.station.id)
-        if profile.country:
-            return Station.objects.filter(country=profile.country)
-            
-    return Station.objects.none()
+    return Station.objects.filter(id__in=scope.station_ids)
+
+def metric_station_filter(scope, station_id=None):
+    """
+    Q object limiting station_id to the scope and the optional station.
+    Returns None when the requested station is outside the scope.
+    """
+    if station_id:
+        if not scope.allows_station(station_id):
+            return None
+        return Q(station_id=station_id)
+    if scope.is_global:
+        return Q()
+    return Q(station_id__in=scope.station_ids)
+
+def metric_scope_filter(scope, station_id=None):
+    """
+    metric_station_filter for DashboardMetric querysets: country-wide scopes
+    filter on the metrics' own indexed country_id instead of a station list.
+    """
+    if not station_id and scope.whole_countries:
+        return Q(country_id__in=scope.country_ids)
+    return metric_station_filter(scope, station_id)
+
+# --- Metric aggregation shared by the metrics API and the bootstrap view ---
+def build_metric_summary(queryset, rollup_queryset, start, end, group_by=None, percentiles=False):
+    data = None
+    if not percentiles:
+        data = summarize_from_rollups(queryset, rollup_queryset, start, end, group_by)
+    if data is None:
+        data = summarize_metrics(queryset, group_by=group_by, percentiles=percentiles)
+    data.update({'group_by': group_by, 'start': start, 'end': end})
+    return data
+
+def build_metric_series(queryset, rollup_queryset, start, end, bucket, max_points=MAX_SERIES_POINTS):
+    window_start, window_end = start, end
+    if bucket == 'auto' or not start or not end:
+        first, last = history_bounds(queryset, rollup_queryset)
+        window_start, window_end = start or first, end or last
+    if bucket == 'auto':
+        bucket = choose_bucket(window_start, window_end, max_points) if window_start and window_end else '1m'
+    elif window_start and window_end and (
+        (window_end - window_start) / BUCKETS[bucket] > max_points * MAX_BUCKET_OVERSAMPLING
+    ):
+        # Every bucket is loaded before downsampling, so a fine bucket over a long window is coarsened.
+        bucket = choose_bucket(window_start, window_end, max_points)
+    # History past the raw retention only exists as rollups, so it can't be bucketed finer than them.
+    if window_start:
+        bucket = retained_bucket(bucket, window_start)
+
+    # 5-minute/hourly/daily rollups serve whole buckets when they exist; raw rows fill in the rest.
+    buckets = bucket_from_rollups(queryset, rollup_queryset, start, end, bucket)
+    if buckets is None:
+        buckets = bucket_metrics(queryset, bucket)
+    series = [
+        {'station': station_id, 'points': downsample_points(points, max_points)}
+        for station_id, points in buckets.items()
+    ]
+    return {'bucket': bucket, 'start': start, 'end': end, 'series': series}
 
 # --- API ViewSets ---
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(AuditedViewSetMixin, viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [IsAdminOrReadOnly]
 
     def get_queryset(self):
-        if self.request.user.is_staff:
-            return UserProfile.objects.all().select_related('user')
-        if self.request.user.is_authenticated:
-            return UserProfile.objects.filter(user=self.request.user).select_related('user')
-        return UserProfile.objects.none()
+        return scoped_profiles(self.request.user)
 
     def perform_destroy(self, instance):
         user_to_delete = instance.user
-        instance.delete()
+        super().perform_destroy(instance)
         user_to_delete.delete()
 
-class CountryViewSet(viewsets.ModelViewSet):
+class CountryViewSet(AuditedViewSetMixin, CachedHierarchyListMixin, viewsets.ModelViewSet):
     serializer_class = CountrySerializer
+    row_serializer = ValuesRowSerializer(CountrySerializer)
     permission_classes = [IsAdminOrReadOnly]
+    cache_resource = 'countries'
+    read_from_replica = True
     def get_queryset(self):
-        allowed_stations = get_allowed_stations_for_user(self.request.user)
-        country_ids = allowed_stations.values_list('country_id', flat=True).distinct()
-        return Country.objects.filter(id__in=country_ids)
+        return scoped_countries(get_user_scope(self.request.user))
 
-class RegionViewSet(viewsets.ModelViewSet):
+class RegionViewSet(AuditedViewSetMixin, CachedHierarchyListMixin, viewsets.ModelViewSet):
     serializer_class = RegionSerializer
+    row_serializer = ValuesRowSerializer(RegionSerializer)
     permission_classes = [IsAdminOrReadOnly]
+    cache_resource = 'regions'
+    read_from_replica = True
     def get_queryset(self):
-        allowed_stations = get_allowed_stations_for_user(self.request.user)
-        region_ids = allowed_stations.values_list('region_id', flat=True).distinct()
-        return Region.objects.filter(id__in=region_ids)
+        return scoped_regions(get_user_scope(self.request.user))
 
-class StationViewSet(viewsets.ModelViewSet):
+class StationViewSet(AuditedViewSetMixin, CachedHierarchyListMixin, viewsets.ModelViewSet):
     serializer_class = StationSerializer
+    row_serializer = ValuesRowSerializer(StationSerializer)
     permission_classes = [IsAdminOrReadOnly]
+    cache_resource = 'stations'
+    read_from_replica = True
+    latest_row_serializer = ValuesRowSerializer(StationLatestMetricSerializer)
     def get_queryset(self):
         return get_allowed_stations_for_user(self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def latest(self, request):
+        """
+        The newest reading of every station in the user's scope, read from the
+        StationLatestMetric snapshot (one row per station), so the cost does not
+        grow with the stored history. Stations without metrics are left out.
+        """
+        station_filter = metric_station_filter(get_user_scope(request.user))
+        queryset = StationLatestMetric.objects.filter(station_filter).order_by('station_id')
+        return Response(self.latest_row_serializer.serialize(self.latest_row_serializer.values(queryset)))
+
 class DashboardMetricViewSet(viewsets.ModelViewSet):
     serializer_class = DashboardMetricSerializer
+    row_serializer = ValuesRowSerializer(DashboardMetricSerializer)
     permission_classes = [IsAdminOrReadOnly]
-    def get_queryset(self):
+    pagination_class = TimestampCursorPagination
+    read_from_replica = True
+    def get_station_filter(self, scope_filter=metric_station_filter):
         station_id = self.request.query_params.get('station', None)
-        allowed_stations = get_allowed_stations_for_user(self.request.user)
+        return scope_filter(get_user_scope(self.request.user), station_id)
+
+    def get_queryset(self):
+        station_filter = self.get_station_filter(metric_scope_filter)
+        if station_filter is None:
+            return DashboardMetric.objects.none()
+        return DashboardMetric.objects.filter(station_filter)
+
+    def get_rollup_queryset(self):
+        station_filter = self.get_station_filter()
+        if station_filter is None:
+            return StationMetricRollup.objects.none()
+        return StationMetricRollup.objects.filter(station_filter)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        # There is no post_delete receiver (it would slow down bulk deletes), so fix the snapshot here.
+        refresh_latest_metrics([instance.station_id])
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if self.action == 'list':
+            renderers.append(ColumnarRenderer())
+        return renderers
+
+    def get_columnar_encoding(self):
+        """The ?encoding= of a ?format=columnar request, or None for the row format."""
+        if self.request.accepted_renderer.format != ColumnarRenderer.format:
+            return None
+        encoding = self.request.query_params.get('encoding', 'json')
+        if encoding not in COLUMNAR_ENCODINGS:
+            raise ValidationError({'encoding': f'Must be one of: {", ".join(COLUMNAR_ENCODINGS)}.'})
+        return encoding
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('bucket'):
+            return self.bucketed_series(request)
+        encoding = self.get_columnar_encoding()
+        # Pages over values_list() rows and serializes them without model instances.
+        queryset = self.row_serializer.values(self.filter_queryset(self.get_queryset()), named=True)
+        page = self.paginate_queryset(queryset)
+        if encoding:
+            return Response({'next': self.paginator.get_next_link(), **columnar_rows(page, encoding)})
+        return self.get_paginated_response(self.row_serializer.serialize(page))
+
+    def bucketed_series(self, request):
+        """
+        Time-bucketed avg/min/max per station, computed in the database.
+        ?bucket=1m|5m|1h|1d|auto picks the bucket size (auto fits the window into
+        ?points=, default 1000; explicit buckets far too fine for the window are
+        coarsened); series longer than ?points= are LTTB-downsampled.
+        ?format=columnar returns each series as parallel arrays.
+        """
+        bucket = request.query_params.get('bucket')
+        if bucket != 'auto' and bucket not in BUCKETS:
+            return Response(
+                {'bucket': f'Must be one of: auto, {", ".join(BUCKETS)}.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        encoding = self.get_columnar_encoding()
+        max_points = parse_int_param(request.query_params, 'points', MAX_SERIES_POINTS, minimum=3, maximum=MAX_SERIES_POINTS)
+        queryset, start, end = filter_time_window(self.get_queryset(), request.query_params)
+        data = build_metric_series(queryset, self.get_rollup_queryset(), start, end, bucket, max_points)
+        return Response(columnar_series(data, encoding) if encoding else data)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        Aggregated KPIs (count, avg, min, max) computed in the database.
+        Accepts ?group_by=country|region|station and an optional ?start=/?end= window.
+        Reads the rollups when available. ?percentiles=true adds p50/p95
+        (PostgreSQL only), which always requires scanning raw rows, so it only
+        covers metrics still within the raw retention period.
+        """
+        queryset, start, end = filter_time_window(self.get_queryset(), request.query_params)
+        group_by = request.query_params.get('group_by') or None
+        percentiles = request.query_params.get('percentiles', '').lower() in ('1', 'true', 'yes')
+        return Response(build_metric_summary(
+            queryset, self.get_rollup_queryset(), start, end, group_by=group_by, percentiles=percentiles,
+        ))
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """
+        Streams the full metric history as NDJSON (default) or CSV (?format=csv).
+        Supports ?station=, ?country= and ?start=/?end=. Rows are read through a
+        server-side cursor, so memory use does not grow with the export size.
+        """
+        queryset, start, end = filter_time_window(self.get_queryset(), request.query_params)
+        country_id = request.query_params.get('country')
+        if country_id:
+            queryset = queryset.filter(country_id=country_id)
+        # The rows are read while streaming, after the request's replica routing has ended.
+        rows = iter_export_rows(queryset.using(current_read_database(DashboardMetric)).order_by('timestamp', 'id'))
 
-        if station_id:
-            return DashboardMetric.objects.filter(station_id=station_id, station__in=allowed_stations)
-        
-        return DashboardMetric.objects.filter(station__in=allowed_stations)
+        renderer = request.accepted_renderer
+        stream = stream_csv(rows) if renderer.format == 'csv' else stream_ndjson(rows)
+        response = StreamingHttpResponse(stream, content_type=f'{renderer.media_type}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="metrics.{renderer.format}"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def ingest(self, request):
+        """
+        Batch metric ingestion. The body is a JSON array or, with an
+        application/x-ndjson content type, one JSON object per line. It is parsed
+        as a stream. Rows are validated against the cached station IDs and written
+        in bulk, and the response reports accepted/rejected counts.
+        """
+        if request.stream is None:
+            return Response({'error': 'Empty request body.'}, status=status.HTTP_400_BAD_REQUEST)
+        body = codecs.getreader('utf-8')(request.stream)
+        records = iter_ndjson(body) if 'ndjson' in request.content_type else iter_json_array(body)
+        try:
+            result = ingest_metric_records(records)
+        except ValueError as e:
+            return Response({'error': f'Malformed request body: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED if result['accepted'] else status.HTTP_400_BAD_REQUEST)
 
 class AuditLogViewSet(viewsets.ModelViewSet):
     serializer_class = AuditLogSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = TimestampCursorPagination
+    read_from_replica = True
     def get_queryset(self):
         if self.request.user.is_staff:
             return AuditLog.objects.all().select_related('user')
         return AuditLog.objects.none()
 
+class StationAlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Alerts stored by the anomaly scan (manage.py detect_anomalies), newest
+    first. Staff only; filter with ?station=, ?metric=, ?kind=, ?severity=
+    and ?start=/?end=.
+    """
+    serializer_class = StationAlertSerializer
+    permission_classes = [IsAdminUser]
+    pagination_class = TimestampCursorPagination
+    filter_params = ('station', 'metric', 'kind', 'severity')
+
+    def get_queryset(self):
+        queryset = StationAlert.objects.all()
+        if self.action == 'list':
+            params = self.request.query_params
+            queryset = queryset.filter(**{name: params[name] for name in self.filter_params if params.get(name)})
+            queryset, _, _ = filter_time_window(queryset, params)
+        return queryset
+
 # --- Custom API View for Current User ---
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -127,12 +365,110 @@ def current_user_profile_view(request):
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# --- Dashboard Bootstrap ---
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def dashboard_bootstrap_view(request):
+    """
+    Everything the dashboard needs for its first render, in one response: the
+    scoped hierarchy, the visible users and the current profile, the KPI
+    summary by country and the first station's downsampled series.
+    """
+    scope = get_user_scope(request.user)
+    users = UserProfileSerializer(scoped_profiles(request.user), many=True).data
+    stations = StationSerializer(scoped_stations(scope), many=True).data
+    countries = CountrySerializer(scoped_countries(scope), many=True).data
+
+    metrics = DashboardMetric.objects.filter(metric_scope_filter(scope))
+    rollups = StationMetricRollup.objects.filter(metric_station_filter(scope))
+    summary = build_metric_summary(metrics, rollups, None, None, group_by='country')
+
+    station_series = None
+    if stations:
+        first_station = stations[0]['id']
+        series = build_metric_series(
+            metrics.filter(station_id=first_station), rollups.filter(station_id=first_station), None, None, 'auto',
+        )
+        points = series['series'][0]['points'] if series['series'] else []
+        station_series = {'station': first_station, 'bucket': series['bucket'], 'points': points}
+
+    return Response({
+        'profile': next((user for user in users if user['id'] == request.user.id), None),
+        'users': users,
+        'stations': stations,
+        'countries': countries,
+        'summary': summary,
+        'station_series': station_series,
+    })
+
+
+# --- Performance Statistics ---
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def perf_stats_view(request):
+    """
+    Rolling per-endpoint query/latency statistics recorded by PerfMiddleware
+    in this process. DELETE clears them.
+    """
+    if request.method == 'DELETE':
+        perf.registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response({
+        'enabled': perf.perf_enabled(),
+        'n_plus_one_threshold': perf.n_plus_one_threshold(),
+        'endpoints': perf.registry.snapshot(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def database_stats_view(request):
+    """Connection management per database alias in this process (see dashboard/pooling.py)."""
+    return Response(pooling.connection_stats())
+
+
+# --- Live Metric Stream (ASGI) ---
+def live_updates_available(request):
+    # Under WSGI Django would collect the endless stream into a list and block the worker for good.
+    return isinstance(request, ASGIRequest)
+
+
+async def metric_stream_view(request):
+    """
+    Server-Sent Events stream of new metrics within the user's scope,
+    optionally limited to one ?station=. A reconnecting client's Last-Event-ID
+    replays the rows it missed. Needs an ASGI server to stream; under WSGI it
+    answers 501.
+    """
+    if not live_updates_available(request):
+        return JsonResponse({'error': 'Live updates need the ASGI server.'}, status=501)
+    user = await request.auser()
+    if not user.is_authenticated:
+        return JsonResponse({'error': 'Authentication required.'}, status=401)
+    scope = await sync_to_async(get_user_scope)(user)
+    station_id = request.GET.get('station') or None
+    if station_id and not scope.allows_station(station_id):
+        return JsonResponse({'error': 'Station not found.'}, status=404)
+
+    # Sent by EventSource on reconnect, so the client resumes where it left off.
+    last_event_id = request.headers.get('Last-Event-ID', '')
+    resume_after = int(last_event_id) if last_event_id.isdigit() else None
+    events = stream_metric_events(
+        scope, station_id, resume_after=resume_after, resume_filter=metric_scope_filter(scope, station_id),
+    )
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 # --- Frontend Template Views ---
 @login_required
 def dashboard_view(request):
     return render(request, 'dashboard/dashboard.html', {
         'user_is_admin': request.user.is_staff,
         'username': request.user.username,
+        'live_updates': live_updates_available(request),
     })
 
 def page_not_found_view(request, exception):
@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -50,6 +52,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Inactive unless DATABASE_REPLICAS are configured (see below).
+    'dashboard.replicas.ReplicaRoutingMiddleware',
+    # Inactive unless PERF_INSTRUMENTATION is set (see below).
+    'dashboard.perf.PerfMiddleware',
 ]
 
 ROOT_URLCONF = 'energy_project.urls'
@@ -86,6 +92,56 @@ DATABASES = {
     }
 }
 
+# Connection management (statistics at /api/_db/, staff only). By default
+# connections persist for DB_CONN_MAX_AGE seconds (0 closes them after every
+# request) and are health-checked before reuse. DB_POOL=true uses psycopg 3's
+# connection pool instead (pip install "psycopg[pool]"); prefer it under ASGI,
+# where persistent connections are not reused across requests.
+DB_HEALTH_CHECKS = os.environ.get('DB_CONN_HEALTH_CHECKS', 'True').lower() in ('1', 'true', 'yes')
+if os.environ.get('DB_POOL', 'False').lower() in ('1', 'true', 'yes'):
+    try:
+        from psycopg_pool import ConnectionPool
+    except ImportError as exc:
+        # requirements.txt only installs psycopg2; the pool needs psycopg 3.
+        raise ImproperlyConfigured(
+            'DB_POOL=true needs psycopg 3 and its connection pool: pip install "psycopg[binary,pool]".'
+        ) from exc
+
+    DATABASES['default']['CONN_MAX_AGE'] = 0  # Django refuses persistent connections with a pool.
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            # Seconds a request waits for a free connection before failing.
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            **({'check': ConnectionPool.check_connection} if DB_HEALTH_CHECKS else {}),
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = DB_HEALTH_CHECKS
+
+# Optional read replicas: DB_REPLICA_HOSTS=host[:port],... adds one alias per
+# streaming replica of the default database. Safe requests to the dashboard's
+# read-heavy viewsets are spread over them (see dashboard/replicas.py).
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        # Tests read the test database through the replica alias too.
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['dashboard.replicas.ReplicaRouter']
+# Seconds a client's reads stay on the primary after their own write.
+REPLICA_PIN_SECONDS = float(os.environ.get('REPLICA_PIN_SECONDS', 5))
+# Seconds a replica that failed to connect is skipped before being retried.
+REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+
 
 
 
@@ -131,6 +187,61 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Django REST Framework
+# Only the metrics and audit log endpoints are paginated (keyset pagination,
+# see dashboard/pagination.py); PAGE_SIZE is their default page size.
+REST_FRAMEWORK = {
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 100)),
+    # Same output as DRF's JSONRenderer, encoded with orjson when it is installed.
+    'DEFAULT_RENDERER_CLASSES': [
+        'dashboard.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+# PAGE_SIZE is used without a global DEFAULT_PAGINATION_CLASS on purpose.
+SILENCED_SYSTEM_CHECKS = ['rest_framework.W001']
+
+
+# Caches hold resolved user scopes and the hierarchy (countries/regions/stations)
+# responses. LocMem is per process; set CACHE_DIR to share a file-based cache
+# between the workers of a single node.
+if os.environ.get('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ['CACHE_DIR'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+
+# Seconds between database polls feeding the live metric stream (/api/metrics/stream/).
+METRIC_STREAM_POLL_INTERVAL = float(os.environ.get('METRIC_STREAM_POLL_INTERVAL', 1.0))
+
+
+# Per-request query count/latency instrumentation (dashboard/perf.py). Adds a
+# Server-Timing header to every response and per-endpoint statistics at
+# /api/_perf/ (staff only). Off by default.
+PERF_INSTRUMENTATION = os.environ.get('PERF_INSTRUMENTATION', 'False').lower() in ('1', 'true', 'yes')
+# Recent requests kept per endpoint for the rolling statistics.
+PERF_WINDOW_SIZE = int(os.environ.get('PERF_WINDOW_SIZE', 1000))
+# A query shape repeated more often than this within one request is reported as a likely N+1.
+PERF_N_PLUS_ONE_THRESHOLD = int(os.environ.get('PERF_N_PLUS_ONE_THRESHOLD', 10))
+
+
+# Audit logging (dashboard/audit.py). Events are queued and written by a
+# background thread in batches; set AUDIT_LOG_ASYNC=false to write them inline.
+AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'True').lower() in ('1', 'true', 'yes')
+AUDIT_LOG_QUEUE_SIZE = int(os.environ.get('AUDIT_LOG_QUEUE_SIZE', 10000))
+AUDIT_LOG_BATCH_SIZE = int(os.environ.get('AUDIT_LOG_BATCH_SIZE', 500))
+AUDIT_LOG_FLUSH_INTERVAL = float(os.environ.get('AUDIT_LOG_FLUSH_INTERVAL', 1.0))
+
+
 # --- FIX: Add redirect URLs for login/logout ---
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file